@@ -0,0 +1,347 @@
+"""
+Synthetic Detailed SVRCALD reports and a benchmark harness for
+student_data_processor.
+
+Real reports contain student data and cannot be shared, so this script writes
+reports with the same fixed-width layout (course headers, student lines,
+page-header junk, rejected student IDs) from a seeded random generator and
+times the processor on them.
+
+    python benchmark.py generate report.lis --lines 1M --mix W=5,D=1,P=1,IN=1
+    python benchmark.py run --sizes 10k 1M 10M --modes nonstd std
+
+Each benchmark size is generated once into --data-dir and then measured in a
+fresh process per mode, so peak RSS belongs to that run alone.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+import student_data_processor as sdp
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is reported as unavailable
+    resource = None
+
+
+# ── Synthetic report generator ──────────────────────────────────────────────
+#
+# Print columns are chosen to fall inside the LAYOUTS slices of BOTH modes, so
+# one synthetic report can be processed as Non-Standardized or Standardized.
+# Text fields are left-aligned at their start column; numbers are
+# right-aligned so that they end at the given column, as Banner prints them.
+
+HEADER_COLUMNS = {
+    "term": 0, "subject": 11, "crse": 16, "crn": 22, "cmp": 32, "acct_method": 36,
+    "ins_mthd": 40, "start_date": 46, "census_date": 58, "census2_date": 70,
+    "end_date": 82, "cr_ind": 124, "pe_ind": 132, "cdcp_ind": 136,
+}
+HEADER_TLM_END = 100
+
+STUDENT_COLUMNS = {
+    "student_type": 5, "student_id": 8, "reg_stat": 52, "special_admit": 76,
+    "res_code": 92, "res_ind": 97,
+}
+STUDENT_NUMBER_ENDS = {"res_enrl": 108, "res_hrs": 120, "non_res_enrl": 131, "non_res_hrs": 143}
+
+DEFAULT_MIX = {"W": 40, "D": 10, "P": 10, "IW": 10, "ID": 10, "IN": 10, "S": 10}
+
+SUBJECTS = ("ART", "BIOL", "BUS", "CHEM", "ENGL", "HIST", "MATH", "NURS", "PSY", "WELD")
+DATES = (("18-AUG-2025", "02-SEP-2025", "", "12-DEC-2025"),
+         ("20-OCT-2025", "27-OCT-2025", "03-NOV-2025", "12-DEC-2025"),
+         ("12-JAN-2026", "26-JAN-2026", "", "15-MAY-2026"))
+PAGE_HEADER = (
+    "\f{college:<40}Detailed SVRCALD Report{page:>60}",
+    "Term   Subj Crse  CRN       Cmp Acct Ins   Start       Census      Census2     End",
+    "     Typ Student ID                         Reg Stat                Spec Adm        Res  RI"
+    "  Res Enrl  Res Hours   NR Enrl  NR Hours",
+    "",
+)
+
+
+def _place(fields):
+    """Build one line from (column, text) pairs given in column order."""
+    parts, col = [], 0
+    for start, text in fields:
+        parts.append(" " * (start - col))
+        parts.append(text)
+        col = start + len(text)
+    return "".join(parts).rstrip()
+
+
+def _right(end, text):
+    return end - len(text), text
+
+
+def header_line(term, subject, crse, crn, acct_method, ins_mthd, dates, tlm, cr_ind, pe_ind, cdcp_ind,
+                cmp_code="MC"):
+    c = HEADER_COLUMNS
+    start, census, census2, end = dates
+    return _place([
+        (c["term"], term), (c["subject"], subject), (c["crse"], crse), (c["crn"], crn),
+        (c["cmp"], cmp_code), (c["acct_method"], acct_method), (c["ins_mthd"], ins_mthd),
+        (c["start_date"], start), (c["census_date"], census), (c["census2_date"], census2),
+        (c["end_date"], end), _right(HEADER_TLM_END, tlm),
+        (c["cr_ind"], cr_ind), (c["pe_ind"], pe_ind), (c["cdcp_ind"], cdcp_ind),
+    ])
+
+
+def student_line(student_type, student_id, reg_stat, special_admit, res_code, res_ind,
+                 res_enrl, res_hrs, non_res_enrl, non_res_hrs):
+    c, e = STUDENT_COLUMNS, STUDENT_NUMBER_ENDS
+    return _place([
+        (c["student_type"], student_type), (c["student_id"], student_id), (c["reg_stat"], reg_stat),
+        (c["special_admit"], special_admit), (c["res_code"], res_code), (c["res_ind"], res_ind),
+        _right(e["res_enrl"], res_enrl), _right(e["res_hrs"], res_hrs),
+        _right(e["non_res_enrl"], non_res_enrl), _right(e["non_res_hrs"], non_res_hrs),
+    ])
+
+
+def _hours(rnd, acct_method):
+    if acct_method in ("W", "IW"):
+        value = rnd.choice((1.0, 2.0, 3.0, 3.5, 4.0, 5.0))
+    elif acct_method == "IN":
+        value = rnd.choice((0.5, 1.0, 1.5, 2.0))
+    else:
+        value = rnd.choice((8.0, 17.5, 27.0, 54.0, 108.0, 162.0, 1260.0)) * rnd.choice((1.0, 0.5, 1 / 3))
+    return f"{value:,.2f}"
+
+
+def iter_synthetic_report(sections=None, lines=None, students=(0, 40), mix=None, junk=0.02, bad_ids=0.01,
+                          seed=1):
+    """
+    Yield the lines of a synthetic Detailed SVRCALD report.
+
+    Stops after ``sections`` course sections or, if ``lines`` is given
+    instead, once at least that many lines have been produced. Each section has
+    a random number of students in the inclusive ``students`` range. ``mix``
+    maps accounting method codes to relative weights (default DEFAULT_MIX).
+    ``junk`` is the fraction of lines that are page headers, blank lines and
+    other non-record text; ``bad_ids`` is the fraction of student lines whose
+    ID the processor must reject.
+    """
+    if (sections is None) == (lines is None):
+        raise ValueError("give exactly one of sections or lines")
+    mix = mix or DEFAULT_MIX
+    codes, weights = list(mix), list(mix.values())
+    rnd = random.Random(seed)
+    lo, hi = students
+    per_page = 55
+    page = n = on_page = emitted = 0
+
+    def page_header():
+        nonlocal page
+        page += 1
+        yield from (line.format(college="SYNTHETIC COMMUNITY COLLEGE", page=f"Page {page}")
+                    for line in PAGE_HEADER)
+
+    while (emitted < sections) if sections is not None else (n < lines):
+        term = rnd.choice(("202570", "202530", "202550"))
+        acct_method = rnd.choices(codes, weights)[0]
+        cr_ind = "N" if acct_method == "IN" or rnd.random() < 0.1 else "Y"
+        section = [header_line(
+            term, rnd.choice(SUBJECTS), f"{rnd.randint(1, 299):03d}", f"{rnd.randint(1000, 9999)}",
+            acct_method, rnd.choice(("LEC", "LAB", "ONL", "")), rnd.choice(DATES),
+            rnd.choice(("1.0", "1.5", "17.5", "")), cr_ind,
+            rnd.choice("YN"), "Y" if cr_ind == "N" and rnd.random() < 0.3 else "N",
+        )]
+        for _ in range(rnd.randint(lo, hi)):
+            if rnd.random() < bad_ids:
+                student_id = rnd.choice(("SXXXXXXX", "S12 3456", "SUBTOTAL"))
+            else:
+                student_id = f"S{rnd.randint(1000000, 99999999):08d}"
+            resident = rnd.random() < 0.9
+            hours = _hours(rnd, acct_method)
+            section.append(student_line(
+                rnd.choice("YNN "), student_id, rnd.choice(("RE", "RE", "RW", "AU")),
+                rnd.choice(("Y", "N", "N", "N")), rnd.choice("RN"), "I" if resident else "O",
+                "1.00" if resident else "0.00", hours if resident else "0.00",
+                "0.00" if resident else "1.00", "0.00" if resident else hours,
+            ))
+
+        for _ in range(int(len(section) * junk + rnd.random())):
+            section.insert(rnd.randint(1, len(section)), rnd.choice(("", "  ** Section total **", "-" * 60)))
+        if page == 0 or on_page + len(section) > per_page:
+            yield from page_header()
+            n += len(PAGE_HEADER)
+            on_page = 0
+        yield from section
+        n += len(section)
+        on_page += len(section)
+        emitted += 1
+    yield "** END OF REPORT **"
+
+
+def write_synthetic_report(path, **options):
+    """Write iter_synthetic_report(**options) to ``path`` with CRLF line ends; returns the line count."""
+    count = 0
+    with open(path, "w", newline="\r\n") as f:
+        for line in iter_synthetic_report(**options):
+            f.write(line)
+            f.write("\n")
+            count += 1
+    return count
+
+
+# ── Benchmark ───────────────────────────────────────────────────────────────
+
+def parse_count(text):
+    """'10k' -> 10000, '1M' -> 1000000, '2.5m' -> 2500000."""
+    scale = {"k": 1_000, "m": 1_000_000, "g": 1_000_000_000}.get(text[-1:].lower())
+    return int(float(text[:-1]) * scale) if scale else int(text)
+
+
+def parse_mix(text):
+    """'W=5,D=1' -> {'W': 5.0, 'D': 1.0}"""
+    mix = {}
+    for item in filter(None, text.split(",")):
+        code, _, weight = item.partition("=")
+        mix[code.strip().upper()] = float(weight or 1)
+    return mix
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def measure(file_path, mode, output_dir):
+    """
+    Time one report in this process. Parsing and FTES computation are fused
+    in the pipeline, so stages are measured by difference: a read-only pass,
+    a parse pass that discards rows (with compute_ftes_batch timed inside it),
+    and a full process_file() run whose extra time is the writer's.
+    """
+    rates = sdp.DEFAULT_RATES[mode]
+    parse = sdp.PARSERS[mode][0]
+
+    t0 = perf_counter()
+    with sdp.open_report(file_path) as source:
+        lines = sum(1 for _ in source.lines())
+    read = perf_counter() - t0
+
+    compute = 0.0
+    batch = sdp.compute_ftes_batch
+
+    def timed_batch(*args):
+        nonlocal compute
+        t = perf_counter()
+        result = batch(*args)
+        compute += perf_counter() - t
+        return result
+
+    sdp.compute_ftes_batch = timed_batch
+    try:
+        t0 = perf_counter()
+        with sdp.open_report(file_path) as source:
+            rows = sum(1 for _ in parse(source.lines(), rates, sdp.Diagnostics()))
+        parse_pass = perf_counter() - t0
+    finally:
+        sdp.compute_ftes_batch = batch
+
+    t0 = perf_counter()
+    result = sdp.process_file(file_path, mode, rates, output_dir, diagnostics_level="off")
+    total = perf_counter() - t0
+    os.remove(result.output_file_path)
+
+    return {
+        "mode": mode, "lines": lines, "rows": rows, "bytes": os.path.getsize(file_path),
+        "seconds": total, "lines_per_s": lines / total, "rows_per_s": rows / total,
+        "stages": {"read": read, "parse": parse_pass - read - compute, "compute": compute,
+                   "write": max(total - parse_pass, 0.0)},
+        "peak_rss_mb": peak_rss_mb(), "numpy": sdp.np is not None,
+    }
+
+
+def _format(result):
+    stages = "  ".join(f"{k} {v:6.2f}s" for k, v in result["stages"].items())
+    rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/a"
+    return (f"{result['mode']:<7}{result['lines']:>11,} lines {result['rows']:>10,} rows "
+            f"{result['seconds']:8.2f}s {result['lines_per_s']:>11,.0f} lines/s "
+            f"{result['rows_per_s']:>10,.0f} rows/s  peak RSS {rss:>7}   {stages}")
+
+
+def run_benchmarks(sizes, modes, data_dir, seed=1, json_path=None, **options):
+    results = []
+    for size in sizes:
+        lines = parse_count(size)
+        path = os.path.join(data_dir, f"synthetic_{size}_{seed}.lis")
+        if not os.path.exists(path):
+            t0 = perf_counter()
+            write_synthetic_report(path, lines=lines, seed=seed, **options)
+            print(f"generated {path} in {perf_counter() - t0:.1f}s", file=sys.stderr)
+        for mode in modes:
+            # A fresh interpreter per measurement keeps peak RSS from leaking between sizes
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "_measure", path, mode, data_dir],
+                                 check=True, capture_output=True, text=True).stdout
+            result = json.loads(out)
+            result["size"] = size
+            results.append(result)
+            print(_format(result), flush=True)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def generator_options(p):
+        p.add_argument("--students", default="0-40", metavar="MIN-MAX", help="students per section (default: 0-40)")
+        p.add_argument("--mix", type=parse_mix, metavar="CODE=W,...",
+                       help="accounting method weights (default: W=40,D=10,P=10,IW=10,ID=10,IN=10,S=10)")
+        p.add_argument("--junk", type=float, default=0.02, help="fraction of junk lines (default: 0.02)")
+        p.add_argument("--bad-ids", type=float, default=0.01,
+                       help="fraction of student lines with invalid IDs (default: 0.01)")
+        p.add_argument("--seed", type=int, default=1)
+
+    gen = commands.add_parser("generate", help="write one synthetic report")
+    gen.add_argument("output")
+    size = gen.add_mutually_exclusive_group(required=True)
+    size.add_argument("--lines", type=parse_count, help="approximate line count, e.g. 10k, 1M")
+    size.add_argument("--sections", type=parse_count, help="number of course sections")
+    generator_options(gen)
+
+    bench = commands.add_parser("run", help="generate reports and time the processor on them")
+    bench.add_argument("--sizes", nargs="+", default=["10k", "1M", "10M"])
+    bench.add_argument("--modes", nargs="+", choices=list(sdp.PARSERS), default=list(sdp.PARSERS))
+    bench.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "svrcald_benchmark"),
+                       help="where generated reports are kept between runs")
+    bench.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    generator_options(bench)
+
+    measure_cmd = commands.add_parser("_measure")
+    measure_cmd.add_argument("file")
+    measure_cmd.add_argument("mode")
+    measure_cmd.add_argument("output_dir")
+
+    args = parser.parse_args(argv)
+    if args.command == "_measure":
+        print(json.dumps(measure(args.file, args.mode, args.output_dir)))
+        return 0
+
+    lo, _, hi = args.students.partition("-")
+    options = dict(students=(int(lo), int(hi or lo)), mix=args.mix, junk=args.junk, bad_ids=args.bad_ids)
+    if args.command == "generate":
+        count = write_synthetic_report(args.output, lines=args.lines, sections=args.sections,
+                                       seed=args.seed, **options)
+        print(f"{count:,} lines -> {args.output}")
+    else:
+        os.makedirs(args.data_dir, exist_ok=True)
+        run_benchmarks(args.sizes, args.modes, args.data_dir, args.seed, args.json, **options)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
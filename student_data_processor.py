@@ -1,16 +1,507 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
-import re
+import argparse
+import bz2
+import codecs
+import cProfile
 import csv
+import glob
+import gzip
+import hashlib
+import json
+import locale
+import mmap
+import operator
+import os
+import pickle
+import pstats
+import queue
+import signal
+import sqlite3
+import sys
+import tempfile
+import threading
+import tracemalloc
+import zipfile
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack, nullcontext
+from dataclasses import dataclass, field
 from datetime import datetime
-from collections import defaultdict
+from fnmatch import fnmatch
+from itertools import islice
+from operator import attrgetter, itemgetter
+from time import perf_counter, time
+
+try:
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, ttk
+except ImportError:  # headless Python builds ship without Tk; the CLI still works
+    tk = None
+
+try:
+    import numpy as np
+except ImportError:  # optional: the batch FTES engine falls back to pure Python
+    np = None
 
 
 # ── Shared helpers ──────────────────────────────────────────────────────────
 
-def preprocess_data(data):
-    lines = data.splitlines()
-    return lines
+class ReportReadError(Exception):
+    """Raised when the SVRCALD report itself cannot be read or decoded."""
+
+
+class ReportParseError(ValueError):
+    """
+    Raised when a report line cannot be parsed, e.g. a non-numeric hours field.
+    ``line_number`` is 1-based. Parsers count the lines they are given; once
+    the error leaves a ReportSource it is the line number an editor shows
+    (see ReportSource.__exit__).
+    """
+
+    def __init__(self, line_number, line, reason):
+        super().__init__(line_number, line, reason)
+        self.line_number = line_number
+        self.line = line
+        self.reason = reason
+
+    def __str__(self):
+        return f"line {self.line_number}: {self.reason}: {self.line.strip()!r}"
+
+    def shifted(self, lines):
+        """The same error with its line number offset by ``lines`` (for parts of a report parsed alone)."""
+        return ReportParseError(self.line_number + lines, self.line, self.reason)
+
+
+class ProcessingCancelled(Exception):
+    """Raised by a progress callback to stop processing; partial outputs are removed."""
+
+
+PROGRESS_LINES = 4096       # input lines between progress callbacks
+
+
+class ProgressStatus:
+    """Running counters handed to the ``progress`` callback of process_file()."""
+
+    def __init__(self, total_bytes):
+        self.total_bytes = total_bytes
+        self.bytes_done = 0
+        self.lines = 0
+        self.rows = 0
+        self._t0 = perf_counter()
+
+    @property
+    def elapsed(self):
+        return perf_counter() - self._t0
+
+    @property
+    def rows_per_s(self):
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self):
+        """Seconds left, extrapolated from the bytes read so far; None before the first update."""
+        if not self.bytes_done:
+            return None
+        return self.elapsed * (self.total_bytes - self.bytes_done) / self.bytes_done
+
+
+def track_progress(lines, source, status, progress):
+    """
+    Pass ``lines`` (read from ``source``, a ReportSource) through unchanged,
+    updating ``status`` and calling ``progress(status)`` every PROGRESS_LINES
+    lines and once at the end. The callback may raise ProcessingCancelled to
+    stop the run.
+    """
+    tell = source.tell
+    n = status.lines
+    for n, line in enumerate(lines, n + 1):
+        yield line
+        if not n % PROGRESS_LINES:
+            status.lines = n
+            status.bytes_done = tell()
+            progress(status)
+    status.lines = n
+    status.bytes_done = status.total_bytes
+    progress(status)
+
+
+def _remove_outputs(*paths):
+    """Delete the partial outputs of a failed or cancelled run."""
+    for path in paths:
+        if path:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+DIAGNOSTIC_LEVELS = ("off", "summary", "skipped", "trace")
+
+
+class Diagnostics:
+    """
+    Streams diagnostic messages to an open text file as they are produced.
+
+    Levels are cumulative: "summary" writes end-of-run counts only, "skipped"
+    adds one line per rejected student row, and "trace" adds every input line
+    and parsed record. Parsers test the ``skipped`` / ``trace`` flags before
+    building a message, so a disabled level costs no formatting at all.
+    """
+
+    def __init__(self, file=None, level="summary", metrics=None):
+        if level not in DIAGNOSTIC_LEVELS:
+            raise ValueError(f"unknown diagnostics level {level!r}")
+        rank = DIAGNOSTIC_LEVELS.index(level) if file is not None else 0
+        self.level = level
+        self.enabled = rank >= 1
+        self.skipped = rank >= 2
+        self.trace = rank >= 3
+        self.metrics = metrics      # RunMetrics receiving stage times and counts, or None
+        self._file = file
+        self._started = False
+        self._t0 = perf_counter()
+        if metrics is not None and self.enabled:
+            self.write = self._timed_write
+
+    def write(self, message):
+        if self._started:
+            self._file.write('\n')
+        self._started = True
+        self._file.write(message)
+
+    def _timed_write(self, message):
+        t0 = perf_counter()
+        Diagnostics.write(self, message)
+        self.metrics.stages["diagnostics"] += perf_counter() - t0
+
+    def summary(self, lines, headers, rows, skipped, unknown_methods, label=None):
+        if self.metrics is not None:
+            self.metrics.count(label, lines=lines, header_lines=headers, student_rows=rows,
+                               skipped_rows=skipped, unknown_acct_methods=unknown_methods)
+        if self.enabled:
+            self.write(
+                f"Summary{f' ({label})' if label else ''}: {lines} lines read, {headers} course headers, {rows} student rows, "
+                f"{skipped} skipped rows, {unknown_methods} headers with unknown accounting method, "
+                f"{perf_counter() - self._t0:.2f}s"
+            )
+
+
+# ── Instrumentation ─────────────────────────────────────────────────────────
+#
+# A RunMetrics collects stage times and record counts for one report. Stages
+# are timed per block or per batch, never per input line; only the split
+# between producing rows and writing them costs two clock reads per row, and
+# that is done only when metrics are requested. Finer detail (field slicing,
+# number parsing, formatting) comes from the optional cProfile capture.
+
+STAGES = ("read", "parse", "compute", "diagnostics", "write")
+PROFILERS = ("cprofile", "tracemalloc")
+
+
+class RunMetrics:
+    """
+    Stage times (seconds) and counters for one processed report, handed to
+    the ``metrics`` sinks of process_file(). The stages are read (reading and
+    decoding the report), parse (record detection, field slicing, number
+    parsing), compute (FTES and funding), diagnostics (writing the
+    diagnostics file) and write (formatting and writing the CSV, and any
+    output sinks). Counters are the end-of-run counts the parser reports.
+    """
+
+    def __init__(self, file_path=None, mode=None):
+        self.file_path = file_path
+        self.mode = mode
+        self.started = datetime.now()
+        self.seconds = 0.0
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.counters = {}
+        self.peak_traced_bytes = None       # set by a tracemalloc capture
+        self._t0 = perf_counter()
+        self._producing = 0.0               # time spent producing rows, parse stage included
+
+    def count(self, label=None, **counts):
+        suffix = f".{label.lower()}" if label else ""
+        for key, value in counts.items():
+            key += suffix
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def finish(self):
+        self.seconds = perf_counter() - self._t0
+        stages = self.stages
+        stages["parse"] = max(self._producing - stages["read"] - stages["compute"] - stages["diagnostics"], 0.0)
+
+    def as_dict(self):
+        return {
+            "file": self.file_path, "mode": self.mode, "started": self.started.isoformat(timespec="seconds"),
+            "seconds": round(self.seconds, 6), "stages": {k: round(v, 6) for k, v in self.stages.items()},
+            "counters": dict(self.counters), "peak_traced_bytes": self.peak_traced_bytes,
+        }
+
+    def log_line(self):
+        fields = [f"file={os.path.basename(self.file_path or '-')}", f"mode={self.mode}",
+                  f"seconds={self.seconds:.3f}"]
+        fields += [f"{stage}={seconds:.3f}" for stage, seconds in self.stages.items()]
+        fields += [f"{key}={value}" for key, value in self.counters.items()]
+        if self.peak_traced_bytes is not None:
+            fields.append(f"peak_traced_mb={self.peak_traced_bytes / 1048576:.1f}")
+        return "metrics " + " ".join(fields)
+
+
+def _timed_rows(rows, metrics):
+    """Pass ``rows`` through, timing how long they take to produce (the rest is the consumer's)."""
+    produced = consumed = 0.0
+    t0 = perf_counter()
+    try:
+        for row in rows:
+            t1 = perf_counter()
+            produced += t1 - t0
+            yield row
+            t0 = perf_counter()
+            consumed += t0 - t1
+        produced += perf_counter() - t0
+    finally:
+        metrics._producing += produced
+        metrics.stages["write"] += consumed
+
+
+class MetricsJsonFile:
+    """Metrics sink: appends each run's metrics to ``path`` as one JSON line."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, metrics):
+        line = json.dumps(metrics.as_dict()) + "\n"
+        with open(self.path, 'a') as f:
+            f.write(line)       # one write, so runs in parallel processes do not interleave
+
+
+class MetricsLogLine:
+    """Metrics sink: prints each run's metrics as one key=value line (default: to stderr)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def __call__(self, metrics):
+        print(metrics.log_line(), file=self.stream or sys.stderr, flush=True)
+
+
+class ProfileCapture:
+    """
+    Runs the named PROFILERS around a block of code: "cprofile" records call
+    timings (of the current thread), "tracemalloc" the peak traced memory and
+    the largest allocation sites. save() writes their reports.
+    """
+
+    TOP = 40
+
+    def __init__(self, profilers=()):
+        unknown = set(profilers) - set(PROFILERS)
+        if unknown:
+            raise ValueError(f"unknown profiler(s): {', '.join(sorted(unknown))}")
+        self.profilers = tuple(profilers)
+        self.profile = None
+        self.snapshot = None
+        self.peak = None
+
+    def __enter__(self):
+        if "tracemalloc" in self.profilers:
+            tracemalloc.start()
+        if "cprofile" in self.profilers:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile.disable()
+        if "tracemalloc" in self.profilers:
+            self.peak = tracemalloc.get_traced_memory()[1]
+            self.snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def save(self, output_file_path):
+        """Write the reports next to ``output_file_path``; returns {kind: path}."""
+        outputs = {}
+        if self.profile is not None:
+            outputs["profile"] = companion_path(output_file_path, "profile", ".prof")
+            self.profile.dump_stats(outputs["profile"])
+            outputs["profile_stats"] = companion_path(output_file_path, "profile", ".txt")
+            with open(outputs["profile_stats"], 'w') as f:
+                stats = pstats.Stats(self.profile, stream=f)
+                stats.sort_stats("cumulative").print_stats(self.TOP)
+                stats.sort_stats("tottime").print_stats(self.TOP)
+        if self.snapshot is not None:
+            outputs["memory"] = companion_path(output_file_path, "memory", ".txt")
+            with open(outputs["memory"], 'w') as f:
+                f.write(f"Peak traced memory: {self.peak / 1048576:.1f} MB\n\n")
+                for stat in self.snapshot.statistics("lineno")[:self.TOP]:
+                    f.write(f"{stat}\n")
+        return outputs
+
+
+# ── Report input ────────────────────────────────────────────────────────────
+#
+# Reports are read as bytes: plain files are memory-mapped, and gzip, bzip2
+# and zip archives are decompressed as a stream (found by their magic bytes,
+# whatever the file is called), so archived reports need no temporary copy.
+# Bytes are decoded a block at a time with an explicit encoding and split into
+# lines exactly like str.splitlines(); decoding a block in one call is cheaper
+# than decoding each line, or each field, on its own.
+
+READ_BLOCK_BYTES = 1024 * 1024
+REPORT_PATTERNS = ("*.lis", "*.txt", "*.lis.gz", "*.txt.gz", "*.lis.bz2", "*.txt.bz2", "*.zip")
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".zip")
+
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bzip2"),
+    (b"PK\x03\x04", "zip"),
+)
+
+
+def report_encoding(encoding=None):
+    """
+    Canonical name of the codec reports are read with: ``encoding``, or the
+    system's preferred encoding (what open() uses) if None. Raises LookupError
+    for an unknown encoding.
+    """
+    return codecs.lookup(encoding or locale.getpreferredencoding(False)).name
+
+
+def report_stem(path):
+    """Input file name without its directory, compression suffix and extension."""
+    base = os.path.basename(path)
+    if base.lower().endswith(COMPRESSED_SUFFIXES):
+        base = os.path.splitext(base)[0]
+    return os.path.splitext(base)[0]
+
+
+class ReportSource:
+    """
+    An open report. ``lines()`` yields its decoded lines, ``size`` is its size
+    on disk and ``tell()`` how much of that has been read, for progress. Only
+    uncompressed reports (``compression`` None) can be cut into byte ranges
+    for parallel parsing.
+    """
+
+    def __init__(self, file_path, encoding=None):
+        self.file_path = file_path
+        self.encoding = report_encoding(encoding)
+        self._file = open(file_path, 'rb')
+        try:
+            self.size = os.fstat(self._file.fileno()).st_size
+            magic = self._file.read(4)
+            self._file.seek(0)
+            self.compression = next((kind for prefix, kind in _MAGIC if magic.startswith(prefix)), None)
+            self._map = self._stream = None
+            self._pos = 0
+            self.read_seconds = 0.0         # spent reading and decoding, for RunMetrics
+            if self.compression == "gzip":
+                self._stream = gzip.GzipFile(fileobj=self._file)
+            elif self.compression == "bzip2":
+                self._stream = bz2.BZ2File(self._file)
+            elif self.compression == "zip":
+                self._stream = self._open_zip_member()
+            elif self.size:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self.close()
+            raise
+
+    def _open_zip_member(self):
+        archive = zipfile.ZipFile(self._file)
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if len(members) > 1:
+            members = [info for info in members
+                       if any(fnmatch(info.filename.lower(), pattern) for pattern in ("*.lis", "*.txt"))]
+        if len(members) != 1:
+            raise ReportReadError(f"{self.file_path}: expected one .lis/.txt report in the archive, "
+                                  f"found {len(members)}")
+        return archive.open(members[0])
+
+    def tell(self):
+        return self._pos if self._stream is None else self._file.tell()
+
+    def blocks(self):
+        """Yield the report's bytes in blocks of about READ_BLOCK_BYTES."""
+        if self._map is not None:
+            mm, size = self._map, self.size
+            while self._pos < size:
+                start = self._pos
+                self._pos = min(start + READ_BLOCK_BYTES, size)
+                yield mm[start:self._pos]
+        elif self._stream is not None:
+            read = self._stream.read
+            while block := read(READ_BLOCK_BYTES):
+                yield block
+
+    def lines(self):
+        """Yield the decoded report one line at a time, split exactly like str.splitlines()."""
+        decode = codecs.getincrementaldecoder(self.encoding)().decode
+        carry = ""
+        try:
+            t0 = perf_counter()
+            for block in self.blocks():
+                text = carry + decode(block)
+                # Cut after the last "\n", so a "\r\n" pair never straddles two blocks
+                cut = text.rfind("\n") + 1
+                carry = text[cut:]
+                lines = text[:cut].splitlines()
+                self.read_seconds += perf_counter() - t0
+                yield from lines
+                t0 = perf_counter()
+            yield from (carry + decode(b"", True)).splitlines()
+        except (OSError, EOFError, UnicodeDecodeError, zlib.error, zipfile.BadZipFile) as e:
+            raise ReportReadError(e) from e
+
+    def close(self):
+        for resource in (self._map, self._stream, self._file):
+            if resource is not None:
+                resource.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        # lines() also breaks at form feeds (Banner page breaks) and the other
+        # str.splitlines() separators; renumber parse errors to "\n"-counted lines
+        if isinstance(exc, ReportParseError):
+            physical = physical_line_number(self.file_path, exc.line_number, self.encoding)
+            raise exc.shifted(physical - exc.line_number) from None
+
+
+def physical_line_number(file_path, line_number, encoding=None):
+    """
+    The editor line number (counting "\n" only) of the ``line_number``-th
+    line ReportSource.lines() yields for the report. Reads the report again,
+    so it is meant for error messages.
+    """
+    with open_report(file_path, encoding) as source:
+        decode = codecs.getincrementaldecoder(source.encoding)().decode
+        seen = physical = 0
+        carry = ""
+        for block in source.blocks():
+            *lines, carry = (carry + decode(block)).split("\n")
+            for line in lines:
+                physical += 1
+                # "\n" keeps a break right before it (e.g. "\f\n") counted as splitlines() does
+                seen += len((line + "\n").splitlines())
+                if seen >= line_number:
+                    return physical
+        return physical + 1
+
+
+def open_report(file_path, encoding=None):
+    """Open a report for reading as a ReportSource. Raises ReportReadError if it cannot be opened."""
+    try:
+        return ReportSource(file_path, encoding)
+    except (OSError, EOFError, LookupError, zipfile.BadZipFile) as e:
+        raise ReportReadError(e) from e
 
 
 # ── Non-Standardized accounting helpers (Script 1) ─────────────────────────
@@ -106,11 +597,15 @@ def calculate_ftes_std(acct_method, resident_hours, non_resident_hours, tlm_mult
 
 # ── Shared funding calculation ──────────────────────────────────────────────
 
-def calculate_funding_and_label(resident_ftes, credit_ind, special_admit, cdcp_ind,
-                                rates, student_type=None):
+SCFF_LABELS = ("Unknown", "CDCP", "Special Admit", "Non-Credit", "Credit")
+SCFF_UNKNOWN, SCFF_CDCP, SCFF_SPECIAL_ADMIT, SCFF_NON_CREDIT, SCFF_CREDIT = range(len(SCFF_LABELS))
+SCFF_RATE_KEYS = (None, "cdcp", "special_admit", "non_credit", "credit")
+
+
+def scff_category(credit_ind, special_admit, cdcp_ind, student_type=None):
     """
-    rates is a dict: {"cdcp": float, "special_admit": float, "non_credit": float, "credit": float}
-    student_type is only used in Non-Standardized mode for the special_admit fallback.
+    Return the SCFF category code (an index into SCFF_LABELS) for one student.
+    This is the rate-independent half of calculate_funding_and_label().
     """
     # Fallback for missing special admit (Non-Standardized mode only)
     if student_type is not None:
@@ -118,318 +613,3063 @@ def calculate_funding_and_label(resident_ftes, credit_ind, special_admit, cdcp_i
             special_admit = "Y" if student_type == "Y" else "N"
 
     if cdcp_ind == "Y":
-        ftes_dollars = resident_ftes * rates["cdcp"]
-        label = "CDCP"
-    elif special_admit == "Y":
-        ftes_dollars = resident_ftes * rates["special_admit"]
-        label = "Special Admit"
-    elif credit_ind == "N" and special_admit == "N":
-        ftes_dollars = resident_ftes * rates["non_credit"]
-        label = "Non-Credit"
-    elif credit_ind == "Y" and special_admit == "N":
-        ftes_dollars = resident_ftes * rates["credit"]
-        label = "Credit"
-    else:
-        ftes_dollars = 0
-        label = "Unknown"
+        return SCFF_CDCP
+    if special_admit == "Y":
+        return SCFF_SPECIAL_ADMIT
+    if credit_ind == "N" and special_admit == "N":
+        return SCFF_NON_CREDIT
+    if credit_ind == "Y" and special_admit == "N":
+        return SCFF_CREDIT
+    return SCFF_UNKNOWN
+
+
+def calculate_funding_and_label(resident_ftes, credit_ind, special_admit, cdcp_ind,
+                                rates, student_type=None):
+    """
+    rates is a dict: {"cdcp": float, "special_admit": float, "non_credit": float, "credit": float}
+    student_type is only used in Non-Standardized mode for the special_admit fallback.
+    """
+    category = scff_category(credit_ind, special_admit, cdcp_ind, student_type)
+    if category == SCFF_UNKNOWN:
+        return 0, SCFF_LABELS[SCFF_UNKNOWN]
+    return resident_ftes * rates[SCFF_RATE_KEYS[category]], SCFF_LABELS[category]
+
+
+# ── Batch FTES / funding engine ─────────────────────────────────────────────
+#
+# Parsed student rows are collected column-wise (array('d') for hours, a
+# category code per row) and computed a batch at a time. With NumPy installed
+# large batches are computed with one mask per FTES formula; otherwise, and
+# for small batches, the scalar functions above are applied row by row. Both
+# paths perform the same floating-point operations in the same order, so the
+# results are identical.
+
+# Accounting method -> FTES formula, as implemented by calculate_ftes_nonstd /
+# calculate_ftes_std. Methods not listed produce zero FTES.
+FTES_FORMULAS = {
+    "nonstd": {"W": "weekly", "D": "daily", "P": "actual", "IW": "isweek", "ID": "daily", "IN": "isnc"},
+    "std":    {"S": "daily", "P": "actual", "IN": "isnc"},
+}
+
+NUMPY_MIN_BATCH = 64        # below this the per-call NumPy overhead outweighs the gain
+BATCH_ROWS = 4096           # rows buffered by the parsers before each batch computation
 
-    return ftes_dollars, label
+
+class StudentColumns:
+    """The per-student inputs of the FTES and funding formulas, stored column-wise."""
+
+    __slots__ = ("acct_method", "cr_ind", "res_hrs", "non_res_hrs", "category")
+
+    def __init__(self):
+        self.acct_method = []
+        self.cr_ind = []
+        self.res_hrs = array('d')
+        self.non_res_hrs = array('d')
+        self.category = array('b')
+
+    def __len__(self):
+        return len(self.category)
+
+    def append(self, acct_method, cr_ind, res_hrs, non_res_hrs, category):
+        self.acct_method.append(acct_method)
+        self.cr_ind.append(cr_ind)
+        self.res_hrs.append(res_hrs)
+        self.non_res_hrs.append(non_res_hrs)
+        self.category.append(category)
+
+    def clear(self):
+        self.__init__()
+
+
+@dataclass
+class FtesColumns:
+    """Batch results, one list per output column, aligned with the input rows."""
+    resident_ftes: list
+    non_resident_ftes: list
+    res_hrs: list
+    non_res_hrs: list
+    eligible_hrs: list
+    total_ftes: list
+    ftes_dollars: list
+    labels: list
+
+
+def compute_ftes_batch(mode, columns, rates):
+    """
+    Compute resident/non-resident FTES, (adjusted) contact hours, eligible
+    contact hours, FTES_$ and SCFF labels for every row of ``columns``.
+    Matches calculate_ftes_nonstd / calculate_ftes_std and
+    calculate_funding_and_label exactly.
+    """
+    if np is not None and len(columns) >= NUMPY_MIN_BATCH:
+        return _compute_ftes_numpy(mode, columns, rates)
+    return _compute_ftes_python(mode, columns, rates)
+
+
+def _compute_ftes_python(mode, columns, rates):
+    out = FtesColumns([], [], [], [], [], [], [], [])
+    rate_by_category = [rates[key] if key else 0 for key in SCFF_RATE_KEYS]
+    std = mode == "std"
+    for acct_method, cr_ind, res_hrs, non_res_hrs, category in zip(
+            columns.acct_method, columns.cr_ind, columns.res_hrs, columns.non_res_hrs, columns.category):
+        if std:
+            # tlm_mult is not used by the Standardized formulas
+            resident_ftes, non_resident_ftes, res_hrs, non_res_hrs, eligible = calculate_ftes_std(
+                acct_method, res_hrs, non_res_hrs, 1.0, cr_ind)
+        else:
+            resident_ftes, non_resident_ftes, res_hrs, non_res_hrs, eligible = calculate_ftes_nonstd(
+                acct_method, res_hrs, non_res_hrs, cr_ind)
+        out.resident_ftes.append(resident_ftes)
+        out.non_resident_ftes.append(non_resident_ftes)
+        out.res_hrs.append(res_hrs)
+        out.non_res_hrs.append(non_res_hrs)
+        out.eligible_hrs.append(eligible)
+        out.total_ftes.append(resident_ftes + non_resident_ftes)
+        out.ftes_dollars.append(resident_ftes * rate_by_category[category] if category else 0)
+        out.labels.append(SCFF_LABELS[category])
+    return out
+
+
+def _compute_ftes_numpy(mode, columns, rates):
+    formula_of = FTES_FORMULAS[mode]
+    formula = np.array([formula_of.get(a, "") for a in columns.acct_method])
+    non_credit = np.array([c == "N" for c in columns.cr_ind], dtype=bool)
+    res = np.frombuffer(columns.res_hrs, dtype=np.float64)
+    non_res = np.frombuffer(columns.non_res_hrs, dtype=np.float64)
+    category = np.frombuffer(columns.category, dtype=np.int8)
+
+    resident_ftes = np.zeros(len(res))
+    non_resident_ftes = np.zeros(len(res))
+    res_out = res.copy()
+    non_res_out = non_res.copy()
+    eligible = res.copy()
+
+    for name, weeks in (("weekly", 16.5), ("isweek", 17.5)):
+        m = formula == name
+        resident_ftes[m] = (res[m] * weeks) / 525
+        non_resident_ftes[m] = (non_res[m] * weeks) / 525
+
+    m = formula == "daily"
+    resident_ftes[m] = res[m] / 525
+    non_resident_ftes[m] = non_res[m] / 525
+
+    m = formula == "actual"
+    add = m & non_credit & (non_res > 0)
+    eligible[add] = res[add] + non_res[add]
+    resident_ftes[m] = eligible[m] / 525
+    non_resident_ftes[m] = non_res[m] / 525
+
+    m = formula == "isnc"
+    res_out[m] = res[m] * 17.5
+    non_res_out[m] = non_res[m] * 17.5
+    eligible[m] = (res_out[m] + non_res_out[m]) / 2
+    resident_ftes[m] = eligible[m] / 525
+
+    rate_by_category = np.array([rates[key] if key else 0.0 for key in SCFF_RATE_KEYS])
+    ftes_dollars = np.where(category == SCFF_UNKNOWN, 0.0, resident_ftes * rate_by_category[category])
+
+    return FtesColumns(
+        resident_ftes.tolist(), non_resident_ftes.tolist(), res_out.tolist(), non_res_out.tolist(),
+        eligible.tolist(), (resident_ftes + non_resident_ftes).tolist(), ftes_dollars.tolist(),
+        [SCFF_LABELS[c] for c in columns.category],
+    )
+
+
+# ── Fixed-width record layouts ─────────────────────────────────────────────
+#
+# Each report layout is plain data: the (start, end) columns of every field,
+# per record type and accounting mode. A field that a layout does not carry is
+# None and always comes back as "". compile_layout() turns a spec into
+# itemgetter slice tables once, so a new Banner layout version only needs a
+# new entry here.
+
+HEADER_FIELDS = (
+    "term", "subject", "crse", "crn", "cmp", "acct_method", "ins_mthd",
+    "start_date", "census_date", "census2_date", "end_date", "tlm",
+    "cr_ind", "pe_ind", "cdcp_ind",
+)
+
+STUDENT_FIELDS = (
+    "student_type", "student_id", "reg_stat", "special_admit", "res_code",
+    "res_ind", "res_enrl", "res_hrs", "non_res_enrl", "non_res_hrs",
+)
+
+_HEADER_COMMON = {
+    "term":         (0, 6),
+    "subject":      (11, 15),
+    "crse":         (16, 20),
+    "crn":          (22, 26),
+    "cmp":          (32, 34),        # Cmp (e.g. WC)
+    "start_date":   (46, 57),
+    "census_date":  (58, 69),
+    "census2_date": (70, 81),
+    "end_date":     (82, 93),
+    "cr_ind":       (124, 125),
+    "pe_ind":       (132, 133),
+    "cdcp_ind":     (136, 137),
+}
+
+_STUDENT_COMMON = {
+    "student_type": (5, 6),
+    "student_id":   (8, 17),
+    "res_ind":      (97, 98),
+    "res_enrl":     (100, 108),
+    "res_hrs":      (110, 122),
+    "non_res_enrl": (121, 132),
+    "non_res_hrs":  (132, 143),
+}
+
+LAYOUTS = {
+    "nonstd": {
+        "header_digits": 6,              # course header: line starts with a 6-digit term
+        "student_marker": (8, "S"),      # student line: "S" in column 9
+        "header": {**_HEADER_COMMON, "acct_method": (36, 38), "ins_mthd": (40, 43), "tlm": None},
+        "student": {**_STUDENT_COMMON, "reg_stat": (52, 55), "special_admit": (75, 78), "res_code": (91, 94)},
+    },
+    "std": {
+        "header_digits": 6,
+        "student_marker": (8, "S"),
+        "header": {**_HEADER_COMMON, "acct_method": (36, 40), "ins_mthd": None, "tlm": (95, 100)},
+        "student": {**_STUDENT_COMMON, "reg_stat": (52, 54), "special_admit": (76, 77), "res_code": (92, 93)},
+    },
+}
+
+
+class CompiledLayout:
+    """
+    Slice tables and record-type parameters for one layout. ``header(line)``
+    and ``student(line)`` return the raw (unstripped) field strings in
+    HEADER_FIELDS / STUDENT_FIELDS order. The parsers test record types inline
+    from ``header_digits`` and ``marker_col``/``marker`` (a method call per
+    line is measurably slower): a course header is a line starting with
+    ``header_digits`` decimal digits, a student line has ``marker`` at
+    ``marker_col`` and at least one character after it.
+    """
+
+    def __init__(self, spec):
+        self.header = _slice_table(spec["header"], HEADER_FIELDS)
+        self.student = _slice_table(spec["student"], STUDENT_FIELDS)
+        self.header_digits = spec["header_digits"]
+        self.marker_col, self.marker = spec["student_marker"]
+
+
+def _slice_table(spec, fields):
+    missing = [f for f in fields if f not in spec]
+    if missing:
+        raise ValueError(f"layout is missing fields: {', '.join(missing)}")
+    return itemgetter(*(slice(*spec[f]) if spec[f] else slice(0, 0) for f in fields))
+
+
+def compile_layout(mode):
+    return CompiledLayout(LAYOUTS[mode])
+
+
+def is_student_id(sid):
+    """Equivalent to re.fullmatch(r'S\\d{7,9}', sid)."""
+    return 8 <= len(sid) <= 10 and sid[0] == 'S' and sid[1:].isdecimal()
+
+
+def parse_number(text):
+    return float(text.replace(',', '') or '0')
+
+
+# ── Output records ──────────────────────────────────────────────────────────
+#
+# A row does not copy its course header: it references one Section, built once
+# per header. Numbers stay floats until row_values() formats them for the CSV,
+# so in-memory consumers (scenarios, aggregation) never reparse strings.
+
+class Section:
+    """
+    The section-level columns of one course header. ``head`` and ``tail`` are
+    the output columns before and after the student identity columns, in the
+    mode's FIELDNAMES order: Non-Standardized adds Inst Mthd, Standardized adds
+    TLM. The defaults describe the placeholder used before the first header.
+    """
+
+    __slots__ = ("mode", "term", "subject", "crse", "crn", "cmp", "start_date", "census_date",
+                 "census2_date", "end_date", "cr_ind", "pe_ind", "cdcp_ind", "acct_method",
+                 "ins_mthd", "tlm", "head", "tail")
+
+    def __init__(self, mode, term=None, subject=None, crse=None, crn=None, cmp_code=None,
+                 start_date="", census_date="", census2_date="", end_date="",
+                 cr_ind=None, pe_ind=None, cdcp_ind=None, acct_method=None, ins_mthd=None, tlm=1.0):
+        self.mode = mode
+        self.term = term
+        self.subject = subject
+        self.crse = crse
+        self.crn = crn
+        self.cmp = cmp_code
+        self.start_date = start_date
+        self.census_date = census_date
+        self.census2_date = census2_date
+        self.end_date = end_date
+        self.cr_ind = cr_ind
+        self.pe_ind = pe_ind
+        self.cdcp_ind = cdcp_ind
+        self.acct_method = acct_method          # the label written to Acct_Method
+        self.ins_mthd = ins_mthd
+        self.tlm = tlm
+        dates = (start_date, census_date, census2_date, end_date)
+        if mode == "nonstd":
+            self.head = (term, subject, crse, crn, cmp_code, ins_mthd, *dates)
+            self.tail = (cr_ind, pe_ind, cdcp_ind, acct_method)
+        else:
+            self.head = (term, subject, crse, crn, cmp_code, *dates)
+            self.tail = (cr_ind, pe_ind, cdcp_ind, acct_method, tlm)
+
+    def state(self):
+        """Constructor arguments as plain values, for pickling without the class."""
+        return (self.mode, self.term, self.subject, self.crse, self.crn, self.cmp, self.start_date,
+                self.census_date, self.census2_date, self.end_date, self.cr_ind, self.pe_ind,
+                self.cdcp_ind, self.acct_method, self.ins_mthd, self.tlm)
+
+
+class StudentRow:
+    """One student line's fields and computed results; section-level columns live on ``section``."""
+
+    __slots__ = ("section", "student_id", "student_type", "reg_stat", "special_admit", "res_code", "res_ind",
+                 "res_enrl", "res_hrs", "non_res_enrl", "non_res_hrs", "resident_ftes", "non_resident_ftes",
+                 "total_ftes", "eligible_hrs", "ftes_dollars", "scff_label")
+
+    def __init__(self, section, student_id, student_type, reg_stat, special_admit, res_code, res_ind,
+                 res_enrl, res_hrs, non_res_enrl, non_res_hrs, resident_ftes, non_resident_ftes,
+                 total_ftes, eligible_hrs, ftes_dollars, scff_label):
+        self.section = section
+        self.student_id = student_id
+        self.student_type = student_type
+        self.reg_stat = reg_stat
+        self.special_admit = special_admit
+        self.res_code = res_code
+        self.res_ind = res_ind
+        self.res_enrl = res_enrl
+        self.res_hrs = res_hrs
+        self.non_res_enrl = non_res_enrl
+        self.non_res_hrs = non_res_hrs
+        self.resident_ftes = resident_ftes
+        self.non_resident_ftes = non_resident_ftes
+        self.total_ftes = total_ftes
+        self.eligible_hrs = eligible_hrs          # Total Resident and Eligible Non-Resident Contact Hours
+        self.ftes_dollars = ftes_dollars
+        self.scff_label = scff_label
+
+    def state(self):
+        """Everything but the section, as plain values."""
+        return (self.student_id, self.student_type, self.reg_stat, self.special_admit, self.res_code,
+                self.res_ind, self.res_enrl, self.res_hrs, self.non_res_enrl, self.non_res_hrs,
+                self.resident_ftes, self.non_resident_ftes, self.total_ftes, self.eligible_hrs,
+                self.ftes_dollars, self.scff_label)
+
+    def as_dict(self):
+        """The row as written to the CSV, keyed by the mode's FIELDNAMES."""
+        return dict(zip(PARSERS[self.section.mode][1], row_values(self)))
+
+
+def row_values(row):
+    """The CSV columns of a StudentRow in its mode's FIELDNAMES order; numbers are formatted here."""
+    section = row.section
+    return (*section.head, row.student_id, row.student_type, row.reg_stat, row.special_admit,
+            row.res_code, row.res_ind, *section.tail, row.res_enrl, f"{row.res_hrs:.2f}",
+            row.non_res_enrl, f"{row.non_res_hrs:.2f}", f"{row.resident_ftes:.4f}",
+            f"{row.non_resident_ftes:.4f}", f"{row.total_ftes:.4f}", f"{row.eligible_hrs:.2f}",
+            f"{row.ftes_dollars:.2f}", row.scff_label)
+
+
+def pack_rows(rows):
+    """
+    StudentRows as plain tuples, for caches and process pools where the
+    classes may not be importable under the same name: (sections, rows), each
+    row being (section index, *StudentRow.state()).
+    """
+    index, sections, packed = {}, [], []
+    for row in rows:
+        section = row.section
+        k = index.get(section)          # identity: the dict also keeps each Section alive
+        if k is None:
+            k = index[section] = len(sections)
+            sections.append(section.state())
+        packed.append((k, *row.state()))
+    return sections, packed
+
+
+def unpack_rows(sections, packed):
+    """Inverse of pack_rows(); rows of one section share a Section again."""
+    sections = [Section(*state) for state in sections]
+    return [StudentRow(sections[k], *state) for k, *state in packed]
+
+
+def _emit_rows(mode, pending, batch, rates, diagnostics, run=None):
+    """Compute one buffered batch of students and yield their StudentRows in input order."""
+    metrics = diagnostics.metrics
+    if metrics is None:
+        result = compute_ftes_batch(mode, batch, rates)
+    else:
+        t0 = perf_counter()
+        result = compute_ftes_batch(mode, batch, rates)
+        metrics.stages["compute"] += perf_counter() - t0
+    if run is not None:
+        run.extend(batch, result)
+    trace = diagnostics.trace
+    for ((section, student_id, student_type, reg_stat, special_admit, res_code, res_ind, res_enrl, non_res_enrl),
+         resident_ftes, non_resident_ftes, res_hrs, non_res_hrs, totalresANDeligbNCResContHrs,
+         total_ftes, ftes_dollars, scff_label) in zip(
+            pending, result.resident_ftes, result.non_resident_ftes, result.res_hrs, result.non_res_hrs,
+            result.eligible_hrs, result.total_ftes, result.ftes_dollars, result.labels):
+        yield StudentRow(section, student_id, student_type, reg_stat, special_admit, res_code, res_ind,
+                         res_enrl, res_hrs, non_res_enrl, non_res_hrs, resident_ftes, non_resident_ftes,
+                         total_ftes, totalresANDeligbNCResContHrs, ftes_dollars, scff_label)
+
+        if trace:
+            diagnostics.write(
+                f"Captured student data: ID: {student_id}, Res Hours: {res_hrs}, Non-Res Hours: {non_res_hrs}, "
+                f"Res FTES: {resident_ftes}, Non-Res FTES: {non_resident_ftes}, Total FTES: {total_ftes}, "
+                f"TotalResANDEligbNCResContHrs: {totalresANDeligbNCResContHrs}, FTES_$: {ftes_dollars}, SCFF_FTES: {scff_label}"
+            )
+    pending.clear()
+    batch.clear()
 
 
 # ── File processing: Non-Standardized ──────────────────────────────────────
 
-def process_file_nonstd(file_path, rates):
-    try:
-        with open(file_path, 'r') as file:
-            data = file.read()
-    except PermissionError as e:
-        messagebox.showerror("Permission Error", f"Permission denied: {e}")
-        return
-    except Exception as e:
-        messagebox.showerror("Error", f"Could not read file: {e}")
-        return
+FIELDNAMES_NONSTD = [
+    "Term", "Subject", "Crse", "CRN", "Cmp", "Inst Mthd",
+    "Start Date", "Census Date", "Census 2 Date", "End Date",
+    "Student ID", "Student Type",
+    "Reg Stat", "Special Admit", "Res Code", "Res Ind", "Credit Ind",
+    "PE Ind", "CDCP Ind", "Acct_Method", "Resident Enrollment",
+    "Resident Contact Hours", "Non-Resident Enrollment",
+    "Non-Resident Contact Hours", "Resident FTES", "Non-Resident FTES",
+    "Total FTES", "Total Resident and Eligible Non-Resident Contact Hours",
+    "FTES_$", "SCFF_FTES",
+]
+
+
+def parse_records_nonstd(lines, rates, diagnostics, run=None):
+    """Yield one StudentRow per student line of a Non-Standardized report.
+    If ``run`` (a ParsedRun) is given, the rate-independent results are added to it.
+    """
+    layout = compile_layout("nonstd")
+    header_fields, student_fields = layout.header, layout.student
+    digits, marker_col, marker = layout.header_digits, layout.marker_col, layout.marker
+    strip = str.strip
 
-    lines = preprocess_data(data)
-    results = []
-    diagnostics = []
+    section = Section("nonstd")
+    acct_method = cr_ind = cdcp_ind = None
 
-    term = subject = crse = crn = ins_mthd = cr_ind = pe_ind = cdcp_ind = None
-    acct_method = acct_method_label = cmp_code = None
-    start_date = census_date = census2_date = end_date = ""
+    trace, log_skipped = diagnostics.trace, diagnostics.skipped
+    headers = rows = skipped = unknown_methods = 0
+    pending, batch = [], StudentColumns()
+    batch_rows = 1 if trace else BATCH_ROWS
+    i = -1
 
     for i, line in enumerate(lines):
-        diagnostics.append(f"Processing line {i}: {line}")
+        if trace:
+            diagnostics.write(f"Processing line {i}: {line}")
 
         # Course header line — starts with 6-digit term code
-        if len(line) >= 6 and re.match(r'^\d{6}', line[:6]):
-            term = line[0:6].strip()
-            subject = line[11:15].strip()
-            crse = line[16:20].strip()
-            crn = line[22:26].strip()
-            cmp_code = line[32:34].strip()          # Cmp (e.g. WC)
-            acct_method = line[36:38].strip()
-            ins_mthd = line[40:43].strip()
-            start_date = line[46:57].strip()         # Start Date
-            census_date = line[58:69].strip()        # Census Date
-            census2_date = line[70:81].strip()       # Census 2 Date
-            end_date = line[82:93].strip()           # End Date
-            cr_ind = line[124:125].strip()
-            pe_ind = line[132:133].strip()
-            cdcp_ind = line[136:137].strip()
+        if len(line) >= digits and line[:digits].isdecimal():
+            (term, subject, crse, crn, cmp_code, acct_method, ins_mthd,
+             start_date, census_date, census2_date, end_date, _tlm,
+             cr_ind, pe_ind, cdcp_ind) = map(strip, header_fields(line))
             acct_method_label = ACCT_METHOD_MAP_NONSTD.get(acct_method, "Unknown")
-            diagnostics.append(
-                f"Detected term: {term}, Subject: {subject}, Crse: {crse}, CRN: {crn}, "
-                f"Cmp: {cmp_code}, Start: {start_date}, Census: {census_date}, "
-                f"Census2: {census2_date}, End: {end_date}"
-            )
+            section = Section("nonstd", term, subject, crse, crn, cmp_code, start_date, census_date,
+                              census2_date, end_date, cr_ind, pe_ind, cdcp_ind, acct_method_label,
+                              ins_mthd=ins_mthd)
+            headers += 1
+            if acct_method not in ACCT_METHOD_MAP_NONSTD:
+                unknown_methods += 1
+            if trace:
+                diagnostics.write(
+                    f"Detected term: {term}, Subject: {subject}, Crse: {crse}, CRN: {crn}, "
+                    f"Cmp: {cmp_code}, Start: {start_date}, Census: {census_date}, "
+                    f"Census2: {census2_date}, End: {end_date}"
+                )
             continue
 
         # Student data line — "S" in column 9
-        if len(line) > 9 and line[8:9] == 'S':
-            sid_window = line[8:17].strip()
-            if re.fullmatch(r'S\d{7,9}', sid_window) is None:
-                diagnostics.append(f"Skipped non-student row at line {i}: sid_window='{sid_window}'")
+        if len(line) > marker_col + 1 and line[marker_col] == marker:
+            (student_type, sid_window, reg_stat, special_admit, res_code, res_ind,
+             res_enrl, res_hrs, non_res_enrl, non_res_hrs) = map(strip, student_fields(line))
+            if not is_student_id(sid_window):
+                skipped += 1
+                if log_skipped:
+                    diagnostics.write(f"Skipped non-student row at line {i}: sid_window='{sid_window}'")
                 continue
 
-            student_id = sid_window
-            student_type = line[5:6].strip()
-            reg_stat = line[52:55].strip()
-            special_admit = line[75:78].strip()
-            res_code = line[91:94].strip()
-            res_ind = line[97:98].strip()
-            res_enrl = float(line[100:108].strip().replace(',', '') or '0')
-            res_hrs = float(line[110:122].strip().replace(',', '') or '0')
-            non_res_enrl = float(line[121:132].strip().replace(',', '') or '0')
-            non_res_hrs = float(line[132:143].strip().replace(',', '') or '0')
-
-            resident_ftes, non_resident_ftes, res_hrs, non_res_hrs, totalresANDeligbNCResContHrs = calculate_ftes_nonstd(
-                acct_method, res_hrs, non_res_hrs, cr_ind
-            )
-            total_ftes = resident_ftes + non_resident_ftes
+            try:
+                res_enrl, non_res_enrl = parse_number(res_enrl), parse_number(non_res_enrl)
+                res_hrs, non_res_hrs = parse_number(res_hrs), parse_number(non_res_hrs)
+            except ValueError as e:
+                raise ReportParseError(i + 1, line, e) from None
+            pending.append((section, sid_window, student_type, reg_stat, special_admit, res_code, res_ind,
+                            res_enrl, non_res_enrl))
+            batch.append(acct_method, cr_ind, res_hrs, non_res_hrs,
+                         scff_category(cr_ind, special_admit, cdcp_ind, student_type))
+            if len(pending) >= batch_rows:
+                rows += len(pending)
+                yield from _emit_rows("nonstd", pending, batch, rates, diagnostics, run)
 
-            ftes_dollars, scff_label = calculate_funding_and_label(
-                resident_ftes, cr_ind, special_admit, cdcp_ind, rates, student_type=student_type
-            )
+    if pending:
+        rows += len(pending)
+        yield from _emit_rows("nonstd", pending, batch, rates, diagnostics, run)
+    diagnostics.summary(i + 1, headers, rows, skipped, unknown_methods)
 
-            results.append({
-                "Term": term,
-                "Subject": subject,
-                "Crse": crse,
-                "CRN": crn,
-                "Cmp": cmp_code,
-                "Inst Mthd": ins_mthd,
-                "Start Date": start_date,
-                "Census Date": census_date,
-                "Census 2 Date": census2_date,
-                "End Date": end_date,
-                "Student ID": student_id,
-                "Student Type": student_type,
-                "Reg Stat": reg_stat,
-                "Special Admit": special_admit,
-                "Res Code": res_code,
-                "Res Ind": res_ind,
-                "Credit Ind": cr_ind,
-                "PE Ind": pe_ind,
-                "CDCP Ind": cdcp_ind,
-                "Acct_Method": acct_method_label,
-                "Resident Enrollment": res_enrl,
-                "Resident Contact Hours": f"{res_hrs:.2f}",
-                "Non-Resident Enrollment": non_res_enrl,
-                "Non-Resident Contact Hours": f"{non_res_hrs:.2f}",
-                "Resident FTES": f"{resident_ftes:.4f}",
-                "Non-Resident FTES": f"{non_resident_ftes:.4f}",
-                "Total FTES": f"{total_ftes:.4f}",
-                "Total Resident and Eligible Non-Resident Contact Hours": f"{totalresANDeligbNCResContHrs:.2f}",
-                "FTES_$": f"{ftes_dollars:.2f}",
-                "SCFF_FTES": scff_label,
-            })
-
-            diagnostics.append(
-                f"Captured student data: ID: {student_id}, Res Hours: {res_hrs}, Non-Res Hours: {non_res_hrs}, "
-                f"Res FTES: {resident_ftes}, Non-Res FTES: {non_resident_ftes}, Total FTES: {total_ftes}, "
-                f"TotalResANDEligbNCResContHrs: {totalresANDeligbNCResContHrs}, FTES_$: {ftes_dollars}, SCFF_FTES: {scff_label}"
-            )
 
-    fieldnames = [
-        "Term", "Subject", "Crse", "CRN", "Cmp", "Inst Mthd",
-        "Start Date", "Census Date", "Census 2 Date", "End Date",
-        "Student ID", "Student Type",
-        "Reg Stat", "Special Admit", "Res Code", "Res Ind", "Credit Ind",
-        "PE Ind", "CDCP Ind", "Acct_Method", "Resident Enrollment",
-        "Resident Contact Hours", "Non-Resident Enrollment",
-        "Non-Resident Contact Hours", "Resident FTES", "Non-Resident FTES",
-        "Total FTES", "Total Resident and Eligible Non-Resident Contact Hours",
-        "FTES_$", "SCFF_FTES",
-    ]
-    _write_outputs(results, diagnostics, fieldnames, "nonstd")
+def process_file_nonstd(file_path, rates, output_dir=".", name=None, **options):
+    return process_file(file_path, "nonstd", rates, output_dir, name, **options)
 
 
 # ── File processing: Standardized ──────────────────────────────────────────
 
-def process_file_std(file_path, rates):
-    try:
-        with open(file_path, 'r') as file:
-            data = file.read()
-    except PermissionError as e:
-        messagebox.showerror("Permission Error", f"Permission denied: {e}")
-        return
-    except Exception as e:
-        messagebox.showerror("Error", f"Could not read file: {e}")
-        return
+FIELDNAMES_STD = [
+    "Term", "Subject", "Crse", "CRN", "Cmp",
+    "Start Date", "Census Date", "Census 2 Date", "End Date",
+    "Student ID", "Student Type",
+    "Reg Stat", "Special Admit", "Res Code", "Res Ind", "Credit Ind",
+    "PE Ind", "CDCP Ind", "Acct_Method", "TLM", "Resident Enrollment",
+    "Resident Contact Hours", "Non-Resident Enrollment",
+    "Non-Resident Contact Hours", "Resident FTES", "Non-Resident FTES",
+    "Total FTES", "Total Resident and Eligible Non-Resident Contact Hours",
+    "FTES_$", "SCFF_FTES",
+]
+
+
+def parse_records_std(lines, rates, diagnostics, run=None):
+    """Yield one StudentRow per student line of a Standardized report.
+    If ``run`` (a ParsedRun) is given, the rate-independent results are added to it.
+    """
+    layout = compile_layout("std")
+    header_fields, student_fields = layout.header, layout.student
+    digits, marker_col, marker = layout.header_digits, layout.marker_col, layout.marker
+    strip = str.strip
 
-    lines = preprocess_data(data)
-    results = []
-    diagnostics = []
+    section = Section("std")
+    acct_method = cr_ind = cdcp_ind = None
 
-    term = subject = crse = crn = cr_ind = pe_ind = cdcp_ind = None
-    acct_method = acct_method_label = cmp_code = None
-    start_date = census_date = census2_date = end_date = ""
-    tlm_mult = 1.0
+    trace = diagnostics.trace
+    headers = rows = unknown_methods = 0
+    pending, batch = [], StudentColumns()
+    batch_rows = 1 if trace else BATCH_ROWS
+    i = -1
 
     for i, line in enumerate(lines):
-        diagnostics.append(f"Processing line {i}: {line}")
+        if trace:
+            diagnostics.write(f"Processing line {i}: {line}")
 
         # Course header line — starts with 6-digit term code
-        if len(line) >= 6 and re.match(r'^\d{6}', line[:6]):
-            term = line[0:6].strip()
-            subject = line[11:15].strip()
-            crse = line[16:20].strip()
-            crn = line[22:26].strip()
-            cmp_code = line[32:34].strip()          # Cmp (e.g. WC)
-            start_date = line[46:57].strip()         # Start Date
-            census_date = line[58:69].strip()        # Census Date
-            census2_date = line[70:81].strip()       # Census 2 Date
-            end_date = line[82:93].strip()           # End Date
-            cr_ind = line[124:125].strip()
-            pe_ind = line[132:133].strip()
-            cdcp_ind = line[136:137].strip()
-            tlm_mult = line[95:100].strip()
-            acct_method_raw = line[36:40]
+        if len(line) >= digits and line[:digits].isdecimal():
+            (term, subject, crse, crn, cmp_code, acct_method_raw, _ins_mthd,
+             start_date, census_date, census2_date, end_date, tlm_mult,
+             cr_ind, pe_ind, cdcp_ind) = map(strip, header_fields(line))
             acct_method = normalize_acct_method(acct_method_raw)
             acct_method_label = ACCT_LABEL_STD.get(acct_method, "Unknown")
-            diagnostics.append(
-                f"Detected term: {term}, Subject: {subject}, Crse: {crse}, CRN: {crn}, "
-                f"Cmp: {cmp_code}, Start: {start_date}, Census: {census_date}, "
-                f"Census2: {census2_date}, End: {end_date}"
-            )
+            section = Section("std", term, subject, crse, crn, cmp_code, start_date, census_date,
+                              census2_date, end_date, cr_ind, pe_ind, cdcp_ind, acct_method_label,
+                              tlm=float(tlm_mult) if tlm_mult.replace('.', '', 1).isdigit() else 1.0)
+            headers += 1
+            if acct_method == "UNKNOWN":
+                unknown_methods += 1
+            if trace:
+                diagnostics.write(
+                    f"Detected term: {term}, Subject: {subject}, Crse: {crse}, CRN: {crn}, "
+                    f"Cmp: {cmp_code}, Start: {start_date}, Census: {census_date}, "
+                    f"Census2: {census2_date}, End: {end_date}"
+                )
             continue
 
         # Student data line — "S" in column 9
-        if len(line) > 9 and line[8:9] == 'S':
-            student_id = line[8:17].strip()
-            student_type = line[5:6].strip()
-            reg_stat = line[52:54].strip()
-            special_admit = line[76:77].strip()
-            res_code = line[92:93].strip()
-            res_ind = line[97:98].strip()
-            res_enrl = float(line[100:108].strip().replace(',', '') or '0')
-            res_hrs = float(line[110:122].strip().replace(',', '') or '0')
-            non_res_enrl = float(line[121:132].strip().replace(',', '') or '0')
-            non_res_hrs = float(line[132:143].strip().replace(',', '') or '0')
-
-            tlm_val = tlm_mult
-            if isinstance(tlm_val, str):
-                tlm_val = float(tlm_val) if tlm_val.replace('.', '', 1).isdigit() else 1.0
-
-            resident_ftes, non_resident_ftes, res_hrs, non_res_hrs, totalresANDeligbNCResContHrs = calculate_ftes_std(
-                acct_method, res_hrs, non_res_hrs, tlm_val, cr_ind
-            )
-            total_ftes = resident_ftes + non_resident_ftes
+        if len(line) > marker_col + 1 and line[marker_col] == marker:
+            (student_type, student_id, reg_stat, special_admit, res_code, res_ind,
+             res_enrl, res_hrs, non_res_enrl, non_res_hrs) = map(strip, student_fields(line))
+            try:
+                res_enrl, non_res_enrl = parse_number(res_enrl), parse_number(non_res_enrl)
+                res_hrs, non_res_hrs = parse_number(res_hrs), parse_number(non_res_hrs)
+            except ValueError as e:
+                raise ReportParseError(i + 1, line, e) from None
+            pending.append((section, student_id, student_type, reg_stat, special_admit, res_code, res_ind,
+                            res_enrl, non_res_enrl))
+            batch.append(acct_method, cr_ind, res_hrs, non_res_hrs, scff_category(cr_ind, special_admit, cdcp_ind))
+            if len(pending) >= batch_rows:
+                rows += len(pending)
+                yield from _emit_rows("std", pending, batch, rates, diagnostics, run)
 
-            ftes_dollars, scff_label = calculate_funding_and_label(
-                resident_ftes, cr_ind, special_admit, cdcp_ind, rates
-            )
+    if pending:
+        rows += len(pending)
+        yield from _emit_rows("std", pending, batch, rates, diagnostics, run)
+    diagnostics.summary(i + 1, headers, rows, 0, unknown_methods)
 
-            results.append({
-                "Term": term,
-                "Subject": subject,
-                "Crse": crse,
-                "CRN": crn,
-                "Cmp": cmp_code,
-                "Start Date": start_date,
-                "Census Date": census_date,
-                "Census 2 Date": census2_date,
-                "End Date": end_date,
-                "Student ID": student_id,
-                "Student Type": student_type,
-                "Reg Stat": reg_stat,
-                "Special Admit": special_admit,
-                "Res Code": res_code,
-                "Res Ind": res_ind,
-                "Credit Ind": cr_ind,
-                "PE Ind": pe_ind,
-                "CDCP Ind": cdcp_ind,
-                "Acct_Method": acct_method_label,
-                "TLM": tlm_val,
-                "Resident Enrollment": res_enrl,
-                "Resident Contact Hours": f"{res_hrs:.2f}",
-                "Non-Resident Enrollment": non_res_enrl,
-                "Non-Resident Contact Hours": f"{non_res_hrs:.2f}",
-                "Resident FTES": f"{resident_ftes:.4f}",
-                "Non-Resident FTES": f"{non_resident_ftes:.4f}",
-                "Total FTES": f"{total_ftes:.4f}",
-                "Total Resident and Eligible Non-Resident Contact Hours": f"{totalresANDeligbNCResContHrs:.2f}",
-                "FTES_$": f"{ftes_dollars:.2f}",
-                "SCFF_FTES": scff_label,
-            })
-
-            diagnostics.append(
-                f"Captured student data: ID: {student_id}, Res Hours: {res_hrs}, Non-Res Hours: {non_res_hrs}, "
-                f"Res FTES: {resident_ftes}, Non-Res FTES: {non_resident_ftes}, Total FTES: {total_ftes}, "
-                f"TotalResANDEligbNCResContHrs: {totalresANDeligbNCResContHrs}, FTES_$: {ftes_dollars}, SCFF_FTES: {scff_label}"
-            )
 
-    fieldnames = [
-        "Term", "Subject", "Crse", "CRN", "Cmp",
-        "Start Date", "Census Date", "Census 2 Date", "End Date",
-        "Student ID", "Student Type",
-        "Reg Stat", "Special Admit", "Res Code", "Res Ind", "Credit Ind",
-        "PE Ind", "CDCP Ind", "Acct_Method", "TLM", "Resident Enrollment",
-        "Resident Contact Hours", "Non-Resident Enrollment",
-        "Non-Resident Contact Hours", "Resident FTES", "Non-Resident FTES",
-        "Total FTES", "Total Resident and Eligible Non-Resident Contact Hours",
-        "FTES_$", "SCFF_FTES",
-    ]
-    _write_outputs(results, diagnostics, fieldnames, "std")
+def process_file_std(file_path, rates, output_dir=".", name=None, **options):
+    return process_file(file_path, "std", rates, output_dir, name, **options)
+
+
+# ── File processing: both modes in one pass ────────────────────────────────
+
+class DualLayout:
+    """
+    The Non-Standardized and Standardized layouts merged into one slice table
+    per record type, so a line is sliced and stripped once per distinct column
+    and the per-mode field tuples are picked from the shared values.
+    """
+
+    def __init__(self, spec_nonstd, spec_std):
+        for key in ("header_digits", "student_marker"):
+            if spec_nonstd[key] != spec_std[key]:
+                raise ValueError(f"layouts disagree on {key}; dual mode needs a shared record format")
+        self.header_digits = spec_nonstd["header_digits"]
+        self.marker_col, self.marker = spec_nonstd["student_marker"]
+        self.header, self.header_nonstd, self.header_std = _merged_slices(
+            spec_nonstd["header"], spec_std["header"], HEADER_FIELDS)
+        self.student, self.student_nonstd, self.student_std = _merged_slices(
+            spec_nonstd["student"], spec_std["student"], STUDENT_FIELDS)
+
+
+def _merged_slices(spec_a, spec_b, fields):
+    columns = []
+    picks = ([], [])
+    for spec, pick in zip((spec_a, spec_b), picks):
+        for f in fields:
+            col = tuple(spec[f]) if spec[f] else (0, 0)
+            if col not in columns:
+                columns.append(col)
+            pick.append(columns.index(col))
+    return itemgetter(*(slice(*c) for c in columns)), itemgetter(*picks[0]), itemgetter(*picks[1])
+
+
+def parse_records_dual(lines, rates, diagnostics):
+    """
+    Tokenize a report once and run every record through both the
+    Non-Standardized and Standardized calculations. ``rates`` maps mode ->
+    rates. Yields (nonstd_row, std_row) StudentRows per student line; nonstd_row is None
+    where Non-Standardized mode rejects the student ID.
+    """
+    layout = DualLayout(LAYOUTS["nonstd"], LAYOUTS["std"])
+    header_values, header_nonstd, header_std = layout.header, layout.header_nonstd, layout.header_std
+    student_values, student_nonstd, student_std = layout.student, layout.student_nonstd, layout.student_std
+    digits, marker_col, marker = layout.header_digits, layout.marker_col, layout.marker
+    strip = str.strip
+
+    section_n = Section("nonstd")
+    section_s = Section("std")
+    acct_n = acct_s = cr_ind = cdcp_ind = None
+
+    trace, log_skipped = diagnostics.trace, diagnostics.skipped
+    headers = rows_s = rows_n = skipped = unknown_n = unknown_s = 0
+    pending_n, batch_n, pending_s, batch_s, has_n = [], StudentColumns(), [], StudentColumns(), []
+    batch_rows = 1 if trace else BATCH_ROWS
+    i = -1
+
+    for i, line in enumerate(lines):
+        if trace:
+            diagnostics.write(f"Processing line {i}: {line}")
+
+        # Course header line — starts with 6-digit term code
+        if len(line) >= digits and line[:digits].isdecimal():
+            values = tuple(map(strip, header_values(line)))
+            (term, subject, crse, crn, cmp_code, acct_n, ins_mthd,
+             start_date, census_date, census2_date, end_date, _tlm,
+             cr_ind, pe_ind, cdcp_ind) = header_nonstd(values)
+            fields_s = header_std(values)
+            acct_s = normalize_acct_method(fields_s[5])
+            tlm_mult = fields_s[11]
+
+            label_n = ACCT_METHOD_MAP_NONSTD.get(acct_n, "Unknown")
+            label_s = ACCT_LABEL_STD.get(acct_s, "Unknown")
+            section_n = Section("nonstd", term, subject, crse, crn, cmp_code, start_date, census_date,
+                                census2_date, end_date, cr_ind, pe_ind, cdcp_ind, label_n, ins_mthd=ins_mthd)
+            section_s = Section("std", term, subject, crse, crn, cmp_code, start_date, census_date,
+                                census2_date, end_date, cr_ind, pe_ind, cdcp_ind, label_s,
+                                tlm=float(tlm_mult) if tlm_mult.replace('.', '', 1).isdigit() else 1.0)
+            headers += 1
+            unknown_n += acct_n not in ACCT_METHOD_MAP_NONSTD
+            unknown_s += acct_s == "UNKNOWN"
+            if trace:
+                diagnostics.write(
+                    f"Detected term: {term}, Subject: {subject}, Crse: {crse}, CRN: {crn}, "
+                    f"Cmp: {cmp_code}, Start: {start_date}, Census: {census_date}, "
+                    f"Census2: {census2_date}, End: {end_date}"
+                )
+            continue
+
+        # Student data line — "S" in column 9
+        if len(line) > marker_col + 1 and line[marker_col] == marker:
+            values = tuple(map(strip, student_values(line)))
+            (student_type, student_id, reg_stat, special_admit, res_code, res_ind,
+             res_enrl, res_hrs, non_res_enrl, non_res_hrs) = student_std(values)
+            try:
+                res_enrl = parse_number(res_enrl)
+                res_hrs = parse_number(res_hrs)
+                non_res_enrl = parse_number(non_res_enrl)
+                non_res_hrs = parse_number(non_res_hrs)
+            except ValueError as e:
+                raise ReportParseError(i + 1, line, e) from None
+
+            pending_s.append((section_s, student_id, student_type, reg_stat, special_admit, res_code, res_ind,
+                              res_enrl, non_res_enrl))
+            batch_s.append(acct_s, cr_ind, res_hrs, non_res_hrs, scff_category(cr_ind, special_admit, cdcp_ind))
+
+            valid = is_student_id(student_id)
+            has_n.append(valid)
+            if valid:
+                _, _, reg_stat, special_admit, res_code = student_nonstd(values)[:5]
+                pending_n.append((section_n, student_id, student_type, reg_stat, special_admit, res_code, res_ind,
+                                  res_enrl, non_res_enrl))
+                batch_n.append(acct_n, cr_ind, res_hrs, non_res_hrs,
+                               scff_category(cr_ind, special_admit, cdcp_ind, student_type))
+            else:
+                skipped += 1
+                if log_skipped:
+                    diagnostics.write(f"Skipped non-student row at line {i}: sid_window='{student_id}'")
+
+            if len(pending_s) >= batch_rows:
+                rows_s += len(pending_s)
+                rows_n += len(pending_n)
+                yield from _emit_dual(pending_n, batch_n, pending_s, batch_s, has_n, rates, diagnostics)
+
+    if pending_s:
+        rows_s += len(pending_s)
+        rows_n += len(pending_n)
+        yield from _emit_dual(pending_n, batch_n, pending_s, batch_s, has_n, rates, diagnostics)
+    diagnostics.summary(i + 1, headers, rows_n, skipped, unknown_n, label="Non-Standardized")
+    diagnostics.summary(i + 1, headers, rows_s, 0, unknown_s, label="Standardized")
+
+
+def _emit_dual(pending_n, batch_n, pending_s, batch_s, has_n, rates, diagnostics):
+    rows_n = _emit_rows("nonstd", pending_n, batch_n, rates["nonstd"], diagnostics)
+    rows_s = _emit_rows("std", pending_s, batch_s, rates["std"], diagnostics)
+    for row_s, valid in zip(rows_s, has_n):
+        yield (next(rows_n) if valid else None), row_s
+    for _ in rows_n:            # runs _emit_rows' batch cleanup
+        pass
+    has_n.clear()
+
+
+COMPARISON_FIELDNAMES = [
+    "Term", "Subject", "Crse", "CRN", "Student ID",
+    "Acct_Method (NonStd)", "Acct_Method (Std)",
+    "Resident FTES (NonStd)", "Resident FTES (Std)", "Resident FTES Diff",
+    "Total FTES (NonStd)", "Total FTES (Std)", "Total FTES Diff",
+    "FTES_$ (NonStd)", "FTES_$ (Std)", "FTES_$ Diff",
+    "SCFF_FTES (NonStd)", "SCFF_FTES (Std)",
+]
+
+
+def comparison_row(row_n, row_s):
+    """
+    Side-by-side Non-Standardized vs Standardized values for one student line,
+    in COMPARISON_FIELDNAMES order (Diff = Std - NonStd, taken between the
+    values as printed so the columns add up in a spreadsheet).
+    """
+    section = row_s.section
+    values = [section.term, section.subject, section.crse, section.crn, row_s.student_id,
+              row_n.section.acct_method if row_n else "", section.acct_method]
+    for attr, fmt in (("resident_ftes", ".4f"), ("total_ftes", ".4f"), ("ftes_dollars", ".2f")):
+        std = format(getattr(row_s, attr), fmt)
+        if row_n is None:
+            values += ("", std, "")
+        else:
+            nonstd = format(getattr(row_n, attr), fmt)
+            values += (nonstd, std, format(float(std) - float(nonstd), fmt))
+    values += (row_n.scff_label if row_n else "", row_s.scff_label)
+    return values
 
 
 # ── Output writer ───────────────────────────────────────────────────────────
 
-def _write_outputs(results, diagnostics, fieldnames, tag):
+@dataclass
+class ProcessResult:
+    file_path: str
+    output_file_path: str
+    diagnostic_file_path: str | None
+    rows: int
+    scenario_file_path: str | None = None
+    run: "ParsedRun | None" = None
+    outputs: dict = field(default_factory=dict)     # further files written, by kind
+    metrics: "RunMetrics | None" = None
+    mode: str | None = None                         # "nonstd", "std" or "both"
+
+
+PARSERS = {
+    "nonstd": (parse_records_nonstd, FIELDNAMES_NONSTD),
+    "std":    (parse_records_std, FIELDNAMES_STD),
+}
+
+MODES = ("nonstd", "std", "both")
+
+
+def process_file(file_path, mode, rates, output_dir=".", name=None, *, metrics=(), profile=(), **options):
+    """
+    Parse one Detailed SVRCALD report and write its CSV and diagnostics files
+    into ``output_dir``. ``name`` (usually the input file stem) is added to the
+    output file names so several reports can be processed into one folder.
+    ``diagnostics_level`` is one of DIAGNOSTIC_LEVELS; "off" writes no
+    diagnostics file.
+
+    ``scenarios`` ({name: rates}) additionally writes per-scenario FTES_$ totals
+    by SCFF category, and ``keep_run`` returns the ParsedRun in the result so
+    more scenarios can be computed later without reparsing.
+
+    ``cache`` (a BlockCache) reuses previously parsed course blocks whose text
+    is unchanged; it is bypassed at the "skipped" and "trace" diagnostics levels.
+
+    ``chunk_workers`` > 1 parses a large report (PARALLEL_MIN_BYTES or more)
+    in header-aligned chunks on that many processes; output is identical to
+    the serial path. It is not combined with the cache and, like the cache,
+    is bypassed at the "skipped" and "trace" levels.
+
+    ``mode`` "both" parses the report once for both accounting modes (``rates``
+    then maps mode -> rates) and writes one CSV per mode, plus a side-by-side
+    comparison CSV when ``compare`` is set; see process_file_dual().
+
+    ``progress`` is called with a ProgressStatus as the report is read (see
+    track_progress()) and may raise ProcessingCancelled to stop the run. If
+    the run fails or is cancelled, the partial CSV and diagnostics files are
+    deleted and the exception propagates.
+
+    ``sinks`` (e.g. a SqliteSink) receive every row as it is written, then
+    finish(result) once the run succeeds or abort() if it fails.
+
+    The report may be gzip, bzip2 or zip compressed (see ReportSource) and is
+    decoded with ``encoding`` (default: the system's preferred encoding).
+
+    ``metrics`` are callables (e.g. MetricsJsonFile, MetricsLogLine, or any
+    function) that each receive the run's RunMetrics once it succeeds; the
+    result carries it as well. ``profile`` names PROFILERS to run around the
+    processing; their reports are written next to the CSV (see ProfileCapture).
+
+    Raises ReportReadError if the report cannot be opened or decoded,
+    ReportParseError (a ValueError, with the 1-based line number) if a student
+    line cannot be parsed, and OSError if the outputs cannot be written. Never
+    touches the GUI.
+    """
+    if not metrics and not profile:
+        return _process_file(file_path, mode, rates, output_dir, name, **options)
+
+    run_metrics = RunMetrics(file_path, mode)
+    capture = ProfileCapture(profile)
+    with capture:
+        result = _process_file(file_path, mode, rates, output_dir, name, run_metrics=run_metrics, **options)
+    run_metrics.finish()
+    run_metrics.peak_traced_bytes = capture.peak
+    result.outputs.update(capture.save(result.output_file_path))
+    result.metrics = run_metrics
+    for sink in metrics:
+        sink(run_metrics)
+    return result
+
+
+def _process_file(file_path, mode, rates, output_dir=".", name=None, *, diagnostics_level="summary",
+                  scenarios=None, keep_run=False, cache=None, compare=False, chunk_workers=1,
+                  progress=None, sinks=(), encoding=None, run_metrics=None):
+    """process_file() without metrics sinks or profiling; ``run_metrics`` collects the stage times."""
+    if mode == "both":
+        if scenarios or keep_run or cache is not None:
+            raise ValueError("rate scenarios and the section cache need a single accounting mode")
+        return process_file_dual(file_path, rates, output_dir, name, diagnostics_level=diagnostics_level,
+                                 compare=compare, progress=progress, sinks=sinks, encoding=encoding,
+                                 run_metrics=run_metrics)
+
+    parse, fieldnames = PARSERS[mode]
+    source = open_report(file_path, encoding)
+
+    run = ParsedRun(mode, file_path) if scenarios or keep_run else None
+    lines = source.lines()
+    status = None
+    if progress is not None:
+        status = ProgressStatus(source.size)
+        lines = track_progress(lines, source, status, progress)
+
+    per_line_diagnostics = diagnostics_level not in ("off", "summary")
+    if cache is not None and not per_line_diagnostics:
+        def records(diagnostics):
+            return parse_records_cached(mode, lines, rates, diagnostics, cache, run)
+    elif (chunk_workers > 1 and not per_line_diagnostics and source.compression is None
+          and chunkable_encoding(source.encoding) and source.size >= PARALLEL_MIN_BYTES):
+        def records(diagnostics):
+            return parse_records_parallel(mode, file_path, rates, diagnostics, chunk_workers, run,
+                                          encoding=source.encoding, status=status, progress=progress)
+    else:
+        def records(diagnostics):
+            return parse(lines, rates, diagnostics, run)
+    if status is not None:
+        parse_rows = records
+
+        def records(diagnostics):
+            return _count_rows(parse_rows(diagnostics), status)
+
+    try:
+        with source:
+            output_file_path, diagnostic_file_path, rows = _write_outputs(
+                records, fieldnames, mode, output_dir, name, diagnostics_level, sinks, run_metrics,
+            )
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+    if run_metrics is not None:
+        run_metrics.stages["read"] += source.read_seconds
+    if cache is not None:
+        cache.prune()
+    result = ProcessResult(file_path, output_file_path, diagnostic_file_path, rows, mode=mode,
+                           run=run if keep_run else None)
+    for sink in sinks:
+        sink.finish(result)
+    if scenarios:
+        result.scenario_file_path = write_scenario_totals(
+            companion_path(output_file_path, "scenario_totals"), run, scenarios)
+    return result
+
+
+def _count_rows(rows, status):
+    """Pass ``rows`` through, counting them in ``status.rows`` for the progress callback."""
+    for row in rows:
+        status.rows += 1
+        yield row
+
+
+def companion_path(output_file_path, kind, ext=".csv"):
+    """Path of another output of the same run, e.g. kind="scenario_totals"."""
+    head, base = os.path.split(output_file_path)
+    suffix = os.path.splitext(base)[0].removeprefix("student_data_")
+    return os.path.join(head, f"{kind}_{suffix}{ext}")
+
+
+def process_file_dual(file_path, rates, output_dir=".", name=None, *, diagnostics_level="summary",
+                      compare=False, progress=None, sinks=(), encoding=None, run_metrics=None):
+    """
+    Read and tokenize a report once, writing both the Non-Standardized and the
+    Standardized CSV (and optionally a comparison CSV) in the same pass.
+    ``rates`` maps mode -> rates. The result's ``output_file_path`` is the
+    Non-Standardized CSV; the others are in ``outputs`` ("std", "comparison").
+    ``run_metrics`` (a RunMetrics) collects stage times and counts.
+    """
+    source = open_report(file_path, encoding)
+
+    suffix = _output_suffix(name)
+    paths = {
+        "nonstd": os.path.join(output_dir, f"student_data_nonstd_{suffix}.csv"),
+        "std": os.path.join(output_dir, f"student_data_std_{suffix}.csv"),
+    }
+    if compare:
+        paths["comparison"] = os.path.join(output_dir, f"comparison_{suffix}.csv")
+    diagnostic_file_path = None
+    if diagnostics_level != "off":
+        diagnostic_file_path = os.path.join(output_dir, f"diagnostics_both_{suffix}.txt")
+
+    lines = source.lines()
+    status = None
+    if progress is not None:
+        status = ProgressStatus(source.size)
+        lines = track_progress(lines, source, status, progress)
+
+    rows = 0
+    try:
+        with ExitStack() as stack:
+            stack.enter_context(source)
+            diag_file = stack.enter_context(open(diagnostic_file_path, 'w')) if diagnostic_file_path else None
+            writers = {}
+            for kind, path in paths.items():
+                writer = csv.writer(stack.enter_context(open(path, 'w', newline='')))
+                fieldnames = COMPARISON_FIELDNAMES if kind == "comparison" else PARSERS[kind][1]
+                writer.writerow(fieldnames)
+                writers[kind] = writer.writerow
+            write_n, write_s, write_c = writers["nonstd"], writers["std"], writers.get("comparison")
+
+            pairs = parse_records_dual(lines, rates, Diagnostics(diag_file, diagnostics_level, run_metrics))
+            if status is not None:
+                pairs = _count_rows(pairs, status)
+            if run_metrics is not None:
+                pairs = _timed_rows(pairs, run_metrics)
+            adds = [sink.add for sink in sinks]
+            for row_n, row_s in pairs:
+                if row_n is not None:
+                    write_n(row_values(row_n))
+                write_s(row_values(row_s))
+                if write_c:
+                    write_c(comparison_row(row_n, row_s))
+                for add in adds:
+                    if row_n is not None:
+                        add(row_n)
+                    add(row_s)
+                rows += 1
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        _remove_outputs(diagnostic_file_path, *paths.values())
+        raise
+
+    if run_metrics is not None:
+        run_metrics.stages["read"] += source.read_seconds
+        run_metrics.count(output_rows=rows)
+    outputs = {kind: path for kind, path in paths.items() if kind != "nonstd"}
+    result = ProcessResult(file_path, paths["nonstd"], diagnostic_file_path, rows, outputs=outputs, mode="both")
+    for sink in sinks:
+        sink.finish(result)
+    return result
+
+
+def _output_suffix(name=None):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    diagnostic_file_path = f'diagnostics_{tag}_{timestamp}.txt'
-    with open(diagnostic_file_path, 'w') as f:
-        f.write('\n'.join(diagnostics))
+    return f"{name}_{timestamp}" if name else timestamp
+
 
-    output_file_path = f'student_data_{tag}_{timestamp}.csv'
+def _write_outputs(records, fieldnames, tag, output_dir=".", name=None, diagnostics_level="summary",
+                   sinks=(), metrics=None):
+    """
+    Stream rows into the timestamped CSV and diagnostics files.
+
+    ``records`` is called with the open Diagnostics and must return an iterable
+    of StudentRows; rows are written as they are produced rather than collected.
+    Each row is also passed to the add() of every sink in ``sinks``, and
+    ``metrics`` (a RunMetrics) gets the time spent producing vs writing rows.
+    Returns (output_file_path, diagnostic_file_path, row_count).
+    """
+    suffix = f"{tag}_{_output_suffix(name)}"
+    diagnostic_file_path = None
+    if diagnostics_level != "off":
+        diagnostic_file_path = os.path.join(output_dir, f'diagnostics_{suffix}.txt')
+    output_file_path = os.path.join(output_dir, f'student_data_{suffix}.csv')
+    rows = 0
     try:
-        with open(output_file_path, 'w', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in results:
-                writer.writerow(row)
-        messagebox.showinfo("Success",
-                            f"Output saved to {output_file_path}\n"
-                            f"Diagnostics saved to {diagnostic_file_path}")
-    except Exception as e:
-        messagebox.showerror("Error", f"Could not write to file: {e}")
+        with (open(diagnostic_file_path, 'w') if diagnostic_file_path else nullcontext()) as diag_file, \
+                open(output_file_path, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames)
+            writerow = writer.writerow
+            student_rows = records(Diagnostics(diag_file, diagnostics_level, metrics))
+            if metrics is not None:
+                student_rows = _timed_rows(student_rows, metrics)
+            if sinks:
+                student_rows = _feed_sinks(student_rows, sinks)
+            for row in student_rows:
+                writerow(row_values(row))
+                rows += 1
+    except BaseException:
+        _remove_outputs(output_file_path, diagnostic_file_path)
+        raise
+    if metrics is not None:
+        metrics.count(output_rows=rows)
+    return output_file_path, diagnostic_file_path, rows
+
+
+# ── SQLite output sink ──────────────────────────────────────────────────────
+#
+# Sinks receive every StudentRow next to the CSV writer: add(row) per row, then
+# finish(result) after a successful run or abort() if it fails or is cancelled.
+
+SQLITE_SCHEMA_VERSION = 1
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS loads (
+    load_id     INTEGER PRIMARY KEY,
+    source      TEXT,
+    started     TEXT NOT NULL,
+    finished    TEXT,
+    rows        INTEGER NOT NULL DEFAULT 0,
+    status      TEXT NOT NULL           -- complete / aborted
+);
+CREATE TABLE IF NOT EXISTS sections (
+    term            TEXT NOT NULL,
+    crn             TEXT NOT NULL,
+    subject         TEXT,
+    crse            TEXT,
+    cmp             TEXT,
+    start_date      TEXT,
+    census_date     TEXT,
+    census2_date    TEXT,
+    end_date        TEXT,
+    credit_ind      TEXT,
+    pe_ind          TEXT,
+    cdcp_ind        TEXT,
+    inst_mthd       TEXT,               -- Non-Standardized reports only
+    tlm             REAL,               -- Standardized reports only
+    load_id         INTEGER REFERENCES loads,
+    PRIMARY KEY (term, crn)
+);
+CREATE TABLE IF NOT EXISTS enrollments (
+    term            TEXT NOT NULL,
+    crn             TEXT NOT NULL,
+    mode            TEXT NOT NULL,      -- nonstd / std
+    seq             INTEGER NOT NULL,   -- order of the student line within the section
+    student_id      TEXT,
+    student_type    TEXT,
+    reg_stat        TEXT,
+    special_admit   TEXT,
+    res_code        TEXT,
+    res_ind         TEXT,
+    acct_method     TEXT,
+    res_enrl        REAL,
+    res_hrs         REAL,
+    non_res_enrl    REAL,
+    non_res_hrs     REAL,
+    resident_ftes   REAL,
+    non_resident_ftes REAL,
+    total_ftes      REAL,
+    eligible_hrs    REAL,
+    ftes_dollars    REAL,
+    scff_ftes       TEXT,
+    load_id         INTEGER REFERENCES loads,
+    PRIMARY KEY (term, crn, mode, seq)
+);
+CREATE INDEX IF NOT EXISTS sections_crn ON sections (crn);
+CREATE INDEX IF NOT EXISTS enrollments_crn ON enrollments (crn);
+CREATE INDEX IF NOT EXISTS enrollments_student_id ON enrollments (student_id);
+CREATE INDEX IF NOT EXISTS enrollments_scff_ftes ON enrollments (scff_ftes);
+"""
+
+
+class SqliteSink:
+    """
+    Loads processed rows into a SQLite database with one ``sections`` row per
+    Term/CRN and one ``enrollments`` row per student line (see SQLITE_SCHEMA).
+
+    Loading is an upsert at section level: every Term/CRN a run contains has
+    its section columns replaced and its enrollments for the run's accounting
+    mode deleted, so reloading a report (or a corrected one) never duplicates
+    rows, and sections the report does not contain are left alone. While the
+    report is parsed, rows are staged with executemany() every ``batch_rows``
+    rows in TEMP tables private to the connection, which take no lock on the
+    database; finish() then moves them over in one short transaction. Other
+    processes can load into the same database meanwhile (waiting at most
+    ``timeout`` seconds for each other's finish), readers (WAL mode) see
+    either the previous data or the whole new load, and a failed load leaves
+    the database as it was and is recorded as aborted in ``loads``. One sink
+    can load many runs.
+    """
 
+    def __init__(self, path, batch_rows=10000, timeout=60):
+        self.path = path
+        self.batch_rows = batch_rows
+        self._db = sqlite3.connect(path, timeout=timeout)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SQLITE_SCHEMA_VERSION):
+            raise ValueError(f"{path} has schema version {version}; expected {SQLITE_SCHEMA_VERSION}")
+        self._db.executescript(SQLITE_SCHEMA)
+        self._db.execute(f"PRAGMA user_version = {SQLITE_SCHEMA_VERSION}")
+        self._db.commit()
+        # The staging tables mirror sections/enrollments up to load_id (their
+        # last column), which is only known once finish() inserts the loads row.
+        for table in ("sections", "enrollments"):
+            columns = [info[1] for info in self._db.execute(f"PRAGMA table_info({table})")][:-1]
+            self._db.execute(f"CREATE TEMP TABLE staged_{table} AS SELECT {', '.join(columns)} FROM {table} WHERE 0")
+        self._reset()
+
+    def _reset(self):
+        self._started = None
+        self._seq = {}              # (term, crn, mode) -> next seq
+        self._pending = []
+        self._rows = 0
+        self._db.execute("DELETE FROM temp.staged_sections")
+        self._db.execute("DELETE FROM temp.staged_enrollments")
+        self._db.commit()
+
+    def add(self, row):
+        if self._started is None:
+            self._started = datetime.now().isoformat(timespec="seconds")
+        section = row.section
+        term, crn, mode = section.term or "", section.crn or "", section.mode
+        key = (term, crn, mode)
+        seq = self._seq.get(key)
+        if seq is None:
+            seq = 0
+            self._db.execute(
+                "INSERT INTO temp.staged_sections VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (term, crn, section.subject, section.crse, section.cmp, section.start_date, section.census_date,
+                 section.census2_date, section.end_date, section.cr_ind, section.pe_ind, section.cdcp_ind,
+                 section.ins_mthd if mode == "nonstd" else None, section.tlm if mode == "std" else None),
+            )
+        self._seq[key] = seq + 1
+        self._pending.append((
+            term, crn, mode, seq, row.student_id, row.student_type, row.reg_stat, row.special_admit,
+            row.res_code, row.res_ind, section.acct_method, row.res_enrl, row.res_hrs, row.non_res_enrl,
+            row.non_res_hrs, row.resident_ftes, row.non_resident_ftes, row.total_ftes, row.eligible_hrs,
+            row.ftes_dollars, row.scff_label,
+        ))
+        if len(self._pending) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        self._db.executemany(f"INSERT INTO temp.staged_enrollments VALUES ({', '.join('?' * 21)})", self._pending)
+        self._rows += len(self._pending)
+        self._pending.clear()
+        self._db.commit()       # ends the implicit transaction; the staging tables are private anyway
+
+    def finish(self, result):
+        """Move the staged rows into the database in one transaction, recording ``result``'s source file."""
+        self._flush()
+        started = self._started or datetime.now().isoformat(timespec="seconds")
+        try:
+            self._db.execute("BEGIN IMMEDIATE")
+            load_id = self._db.execute(
+                "INSERT INTO loads (source, started, finished, rows, status) VALUES (?, ?, ?, ?, 'complete')",
+                (os.path.abspath(result.file_path), started, datetime.now().isoformat(timespec="seconds"),
+                 self._rows),
+            ).lastrowid
+            # "WHERE true" keeps the SELECT from swallowing ON CONFLICT.
+            self._db.execute(
+                "INSERT INTO sections SELECT *, ? FROM temp.staged_sections WHERE true ORDER BY rowid "
+                "ON CONFLICT (term, crn) DO UPDATE SET subject = excluded.subject, crse = excluded.crse, "
+                "cmp = excluded.cmp, start_date = excluded.start_date, census_date = excluded.census_date, "
+                "census2_date = excluded.census2_date, end_date = excluded.end_date, "
+                "credit_ind = excluded.credit_ind, pe_ind = excluded.pe_ind, cdcp_ind = excluded.cdcp_ind, "
+                "inst_mthd = COALESCE(excluded.inst_mthd, inst_mthd), tlm = COALESCE(excluded.tlm, tlm), "
+                "load_id = excluded.load_id",
+                (load_id,),
+            )
+            self._db.executemany("DELETE FROM enrollments WHERE term = ? AND crn = ? AND mode = ?",
+                                 list(self._seq))
+            self._db.execute("INSERT INTO enrollments SELECT *, ? FROM temp.staged_enrollments", (load_id,))
+            self._db.commit()
+        except BaseException:
+            self._db.rollback()
+            raise
+        self._reset()
+
+    def abort(self):
+        """Drop the staged rows, leaving the database as it was, and record the load as aborted."""
+        self._db.rollback()
+        if self._started is not None:
+            self._db.execute("INSERT INTO loads (started, finished, status) VALUES (?, ?, 'aborted')",
+                             (self._started, datetime.now().isoformat(timespec="seconds")))
+            self._db.commit()
+        self._reset()
+
+    def close(self):
+        self._db.close()
+
+
+def _feed_sinks(rows, sinks):
+    """Pass ``rows`` through, handing each to every sink's add()."""
+    adds = [sink.add for sink in sinks]
+    for row in rows:
+        for add in adds:
+            add(row)
+        yield row
+
+
+# ── Summary reports ─────────────────────────────────────────────────────────
+#
+# Roll-ups that used to be pivot tables over the output CSV, built while the
+# rows stream past. Rows are first summed per (section, SCFF label), which is
+# one dict lookup per row; when the next section starts those few partial sums
+# are folded into the dimensions, once per section for the section-level ones.
+# Student IDs are numbered densely for the unduplicated headcount. Groups of
+# the few low-cardinality dimensions (and the Total) keep a bitmap of their
+# students; a bitmap is as wide as the run's distinct students, so groups of
+# the others (one per CRN, per subject) keep an array of student numbers
+# instead, costing 4 bytes per row rather than groups x students bits.
+
+# name -> (key columns, key function of a Section, or None to group by SCFF label)
+SUMMARY_DIMENSIONS = {
+    "term":        (("Term",), lambda section: (section.term,)),
+    "cmp":         (("Cmp",), lambda section: (section.cmp,)),
+    "subject":     (("Subject",), lambda section: (section.subject,)),
+    "crn":         (("Term", "CRN", "Subject", "Crse"),
+                    lambda section: (section.term, section.crn, section.subject, section.crse)),
+    "acct_method": (("Acct_Method",), lambda section: (section.acct_method,)),
+    "scff_ftes":   (("SCFF_FTES",), None),
+}
+_DENSE_SUMMARY_DIMENSIONS = {"term", "cmp", "acct_method", "scff_ftes"}
 
-# ═══════════════════════════════════════════════════════════════════════════
-#  GUI
-# ═══════════════════════════════════════════════════════════════════════════
+SUMMARY_FIELDNAMES = [
+    "Rows", "Headcount", "Resident Contact Hours", "Non-Resident Contact Hours",
+    "Total Resident and Eligible Non-Resident Contact Hours",
+    "Resident FTES", "Non-Resident FTES", "Total FTES", "FTES_$",
+]
+_SUMMARY_FORMATS = (None, ".2f", ".2f", ".2f", ".4f", ".4f", ".4f", ".2f")
+
+
+class _Group:
+    """Running sums (in SUMMARY_FIELDNAMES order, minus Headcount) and a student bitmap."""
+
+    __slots__ = ("sums", "students")
+
+    def __init__(self):
+        self.sums = [0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+        self.students = bytearray()
+
+    def add(self, sums, student_ids):
+        self.sums = list(map(operator.add, self.sums, sums))
+        bitmap = self.students
+        top = max(student_ids) >> 3
+        if top >= len(bitmap):
+            bitmap.extend(bytes(top + 1 - len(bitmap) + len(bitmap) // 2))
+        for i in student_ids:
+            bitmap[i >> 3] |= 1 << (i & 7)
+
+    def headcount(self):
+        return int.from_bytes(self.students, "little").bit_count()
+
+
+class _SparseGroup(_Group):
+    """A _Group keeping its students as an array of student numbers (repeats allowed) rather than a bitmap."""
+
+    __slots__ = ()
+
+    def __init__(self):
+        self.sums = [0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+        self.students = array('i')
+
+    def add(self, sums, student_ids):
+        self.sums = list(map(operator.add, self.sums, sums))
+        self.students.extend(student_ids)
+
+    def headcount(self):
+        return len(set(self.students))
+
+
+class _Rollup:
+    """The summary state of one accounting mode."""
+
+    def __init__(self, student_index):
+        self.student_index = student_index
+        self.groups = {name: defaultdict(_Group if name in _DENSE_SUMMARY_DIMENSIONS else _SparseGroup)
+                       for name in SUMMARY_DIMENSIONS}
+        self.total = _Group()
+        self.section = None
+        self.open = {}          # SCFF label -> [sums, student indices] for the current section
+
+    def add(self, row):
+        if row.section is not self.section:
+            self.fold()
+            self.section = row.section
+        acc = self.open.get(row.scff_label)
+        if acc is None:
+            acc = self.open[row.scff_label] = [[0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0], []]
+        sums = acc[0]
+        sums[0] += 1
+        sums[1] += row.res_hrs
+        sums[2] += row.non_res_hrs
+        sums[3] += row.eligible_hrs
+        sums[4] += row.resident_ftes
+        sums[5] += row.non_resident_ftes
+        sums[6] += row.total_ftes
+        sums[7] += row.ftes_dollars
+        index = self.student_index
+        acc[1].append(index.setdefault(row.student_id, len(index)))
+
+    def fold(self):
+        if not self.open:
+            return
+        parts = list(self.open.values())
+        if len(parts) == 1:
+            sums, student_ids = parts[0]
+        else:
+            sums = [sum(column) for column in zip(*(part[0] for part in parts))]
+            student_ids = [i for part in parts for i in part[1]]
+        section = self.section
+        for name, (_, key) in SUMMARY_DIMENSIONS.items():
+            if key is not None:
+                self.groups[name][key(section)].add(sums, student_ids)
+            else:
+                for label, (label_sums, label_ids) in self.open.items():
+                    self.groups[name][(label,)].add(label_sums, label_ids)
+        self.total.add(sums, student_ids)
+        self.open = {}
+
+
+def _summary_values(group):
+    sums = group.sums
+    return [sums[0], group.headcount(),
+            *(format(v, fmt) for v, fmt in zip(sums[1:], _SUMMARY_FORMATS[1:]))]
+
+
+class SummarySink:
+    """
+    Streaming totals by each of SUMMARY_DIMENSIONS: rows, unduplicated
+    headcount, contact hours, FTES and FTES_$. finish() writes one
+    ``summary_<dimension>_*.csv`` per dimension next to the run's CSV, each
+    ending in a Total row whose Headcount counts every distinct Student ID.
+    Sums use the unrounded values, so they can differ from a sum over the CSV
+    in the last printed digit.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._student_index = {}
+        self._rollups = {}
+
+    def add(self, row):
+        rollup = self._rollups.get(row.section.mode)
+        if rollup is None:
+            rollup = self._rollups[row.section.mode] = _Rollup(self._student_index)
+        rollup.add(row)
+
+    def finish(self, result):
+        for mode, rollup in self._rollups.items():
+            rollup.fold()
+            # In a dual-mode run the Standardized CSV is one of the extra outputs
+            base = result.outputs.get(mode, result.output_file_path)
+            for name, (columns, _) in SUMMARY_DIMENSIONS.items():
+                kind = f"summary_{name}"
+                path = companion_path(base, kind)
+                with open(path, 'w', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow([*columns, *SUMMARY_FIELDNAMES])
+                    groups = rollup.groups[name]
+                    for key in sorted(groups, key=lambda k: tuple("" if v is None else v for v in k)):
+                        writer.writerow([*key, *_summary_values(groups[key])])
+                    writer.writerow(["Total", *[""] * (len(columns) - 1), *_summary_values(rollup.total)])
+                result.outputs[kind if len(self._rollups) == 1 else f"{kind}_{mode}"] = path
+        self._reset()
+
+    def abort(self):
+        self._reset()
+
+    def close(self):
+        pass
+
+
+# ── Columnar output ─────────────────────────────────────────────────────────
+#
+# An optional binary companion to the CSV (columns_*.svrc) that reloads
+# without parsing. Layout: the 8-byte COLUMNAR_MAGIC, a little-endian uint32
+# header length, a JSON header, then the column data, each block starting at
+# an 8-byte boundary. Number columns are float64 (unrounded); text columns are
+# dictionary-encoded as uint8/16/32 codes plus a dictionary block (the values
+# joined with "\n", which no report field contains). Header offsets are
+# relative to the first 8-byte boundary after the header. All numbers are
+# little-endian.
+
+COLUMNAR_MAGIC = b"SVRCCOL\x00"
+COLUMNAR_VERSION = 1
+
+# Columns taken from the Section, the row's text fields, and its numbers, by CSV column name
+_COLUMNAR_SECTION = {
+    "nonstd": (("Term", "term"), ("Subject", "subject"), ("Crse", "crse"), ("CRN", "crn"), ("Cmp", "cmp"),
+               ("Inst Mthd", "ins_mthd"), ("Start Date", "start_date"), ("Census Date", "census_date"),
+               ("Census 2 Date", "census2_date"), ("End Date", "end_date"), ("Credit Ind", "cr_ind"),
+               ("PE Ind", "pe_ind"), ("CDCP Ind", "cdcp_ind"), ("Acct_Method", "acct_method")),
+}
+_COLUMNAR_SECTION["std"] = tuple(c for c in _COLUMNAR_SECTION["nonstd"] if c[0] != "Inst Mthd")
+_COLUMNAR_TEXT = (("Student ID", "student_id"), ("Student Type", "student_type"), ("Reg Stat", "reg_stat"),
+                  ("Special Admit", "special_admit"), ("Res Code", "res_code"), ("Res Ind", "res_ind"),
+                  ("SCFF_FTES", "scff_label"))
+_COLUMNAR_NUMBERS = (("Resident Enrollment", "res_enrl"), ("Resident Contact Hours", "res_hrs"),
+                     ("Non-Resident Enrollment", "non_res_enrl"), ("Non-Resident Contact Hours", "non_res_hrs"),
+                     ("Resident FTES", "resident_ftes"), ("Non-Resident FTES", "non_resident_ftes"),
+                     ("Total FTES", "total_ftes"),
+                     ("Total Resident and Eligible Non-Resident Contact Hours", "eligible_hrs"),
+                     ("FTES_$", "ftes_dollars"))
+
+
+COLUMNAR_ROW_GROUP = 65536      # rows held in memory before they are spilled to a temporary file
+
+
+class _ColumnSpill:
+    """
+    One mode's rows on their way to a columnar file. Rows are collected per
+    row group (a section, a Student ID and a row-text code per row, the other
+    text fields as one tuple, and the numbers, interleaved), then split into
+    columns and appended to an anonymous temporary file, so memory holds one
+    row group plus the dictionaries. columns() reads them back column by column.
+    """
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.rows = 0
+        self.sections, self._section_codes = [], {}
+        self.students, self._student_codes = [], {}
+        self.texts, self._text_codes = [], {}
+        self._codes = array('I')
+        self._numbers = array('d')
+        self._groups = []           # (rows, offset) of each row group in the spill file
+        self._spill = None
+        self._text_values = attrgetter(*(attr for _, attr in _COLUMNAR_TEXT[1:]))
+        self._number_values = attrgetter(*(attr for _, attr in _COLUMNAR_NUMBERS))
+
+    def add(self, row):
+        section = self._section_codes.get(row.section)
+        if section is None:
+            section = self._section_codes[row.section] = len(self.sections)
+            self.sections.append(row.section)
+        student = self._student_codes.get(row.student_id)
+        if student is None:
+            student = self._student_codes[row.student_id] = len(self.students)
+            self.students.append(row.student_id)
+        values = self._text_values(row)
+        text = self._text_codes.get(values)
+        if text is None:
+            text = self._text_codes[values] = len(self.texts)
+            self.texts.append(values)
+        self._codes.extend((section, student, text))
+        self._numbers.extend(self._number_values(row))
+        self.rows += 1
+        if self.rows % COLUMNAR_ROW_GROUP == 0:
+            self._flush()
+
+    def _flush(self):
+        """Append the buffered row group to the spill file: the three code columns, then the numbers."""
+        n = len(self._codes) // 3
+        if not n:
+            return
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile()
+        self._groups.append((n, self._spill.tell()))
+        for i in range(3):
+            self._codes[i::3].tofile(self._spill)
+        width = len(_COLUMNAR_NUMBERS)
+        for i in range(width):
+            self._numbers[i::width].tofile(self._spill)
+        self._codes, self._numbers = array('I'), array('d')
+
+    def _spilled(self, k):
+        """Spill column ``k`` (0-2: section, Student ID, row-text codes; 3 on: numbers), one array per row group."""
+        typecode = 'I' if k < 3 else 'd'
+        for n, offset in self._groups:
+            self._spill.seek(offset + 4 * n * min(k, 3) + 8 * n * max(k - 3, 0))
+            data = array(typecode)
+            data.fromfile(self._spill, n)
+            yield data
+
+    def _mapped(self, k, lookup, typecode='I'):
+        return lambda: (array(typecode, map(lookup.__getitem__, codes)) for codes in self._spilled(k))
+
+    def columns(self):
+        """
+        Yield (name, dictionary values or None, chunks) in the mode's CSV order,
+        where chunks() yields the column's codes or float64 numbers as new
+        arrays, one per row group.
+        """
+        self._flush()
+        out = {"Student ID": (self.students, lambda: self._spilled(1))}
+        for name, attr in _COLUMNAR_SECTION[self.mode]:
+            values, remap = _dictionary([getattr(section, attr) for section in self.sections])
+            out[name] = (values, self._mapped(0, remap))
+        if self.mode == "std":
+            out["TLM"] = (None, self._mapped(0, [section.tlm for section in self.sections], 'd'))
+        for i, (name, _) in enumerate(_COLUMNAR_TEXT[1:]):
+            values, remap = _dictionary([fields[i] for fields in self.texts])
+            out[name] = (values, self._mapped(2, remap))
+        for i, (name, _) in enumerate(_COLUMNAR_NUMBERS, 3):
+            out[name] = (None, lambda i=i: self._spilled(i))
+        for name in PARSERS[self.mode][1]:
+            yield (name, *out[name])
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+
+def _dictionary(values_by_code):
+    """The distinct values of ``values_by_code`` (None read as ""), and each code's index among them."""
+    distinct, remap = {}, []
+    for value in values_by_code:
+        remap.append(distinct.setdefault("" if value is None else value, len(distinct)))
+    return list(distinct), remap
+
+
+def write_columnar(path, mode, columns, rows):
+    """
+    Write ``columns`` (as yielded by _ColumnSpill.columns()) for ``rows`` rows
+    to ``path``. Block offsets follow from the row count and dictionary sizes,
+    so the header is written first and every column is streamed after it.
+    """
+    header_columns, blocks, offset = [], [], 0
+
+    def place(size):
+        nonlocal offset
+        start = offset
+        offset += size + -size % 8
+        return start
+
+    for name, values, chunks in columns:
+        if values is None:
+            header_columns.append({"name": name, "type": "f8", "offset": place(8 * rows)})
+            blocks.append(('d', chunks, None))
+            continue
+        typecode = "B" if len(values) <= 0x100 else "H" if len(values) <= 0x10000 else "I"
+        text = "\n".join(values).encode("utf-8")
+        header_columns.append({"name": name, "type": "dict", "codes": typecode,
+                               "offset": place(rows * array(typecode).itemsize),
+                               "dictionary": [place(len(text)), len(text), len(values)]})
+        blocks.append((typecode, chunks, text))
+
+    header = json.dumps({"version": COLUMNAR_VERSION, "mode": mode, "rows": rows,
+                         "columns": header_columns}).encode("utf-8")
+    with open(path, 'wb') as f:
+        f.write(COLUMNAR_MAGIC)
+        f.write(len(header).to_bytes(4, "little"))
+        f.write(header)
+        f.write(bytes(-(len(COLUMNAR_MAGIC) + 4 + len(header)) % 8))
+        for typecode, chunks, text in blocks:
+            size = 0
+            for data in chunks():
+                if data.typecode != typecode:
+                    data = array(typecode, data)
+                if sys.byteorder != "little":
+                    data.byteswap()         # chunks are fresh arrays, so swapping in place is safe
+                data.tofile(f)
+                size += len(data) * data.itemsize
+            f.write(bytes(-size % 8))
+            if text is not None:
+                f.write(text)
+                f.write(bytes(-len(text) % 8))
+    return path
+
+
+class ColumnarSink:
+    """
+    Output sink writing each run's rows to ``columns_*.svrc`` next to its CSV
+    (one file per mode in a dual-mode run; a run without rows still gets a
+    file with the header); read them with ColumnarReport. Rows are spilled
+    to a temporary file as they arrive (see _ColumnSpill), so memory does not
+    grow with the report.
+    """
+
+    def __init__(self):
+        self._spills = {}
+
+    def add(self, row):
+        spill = self._spills.get(row.section.mode)
+        if spill is None:
+            spill = self._spills[row.section.mode] = _ColumnSpill(row.section.mode)
+        spill.add(row)
+
+    def finish(self, result):
+        modes = tuple(PARSERS) if result.mode == "both" else (result.mode,)
+        try:
+            for mode in modes:
+                spill = self._spills.get(mode) or _ColumnSpill(mode)
+                base = result.outputs.get(mode, result.output_file_path)
+                path = write_columnar(companion_path(base, "columns", ".svrc"), mode, spill.columns(), spill.rows)
+                result.outputs["columns" if len(modes) == 1 else f"columns_{mode}"] = path
+        finally:
+            self.abort()
+
+    def abort(self):
+        for spill in self._spills.values():
+            spill.close()
+        self._spills = {}
+
+    def close(self):
+        self.abort()
+
+
+class ColumnarReport:
+    """
+    A columns_*.svrc file, memory-mapped. numbers(name) returns a float64
+    memoryview straight over the file (np.asarray() wraps it without a copy),
+    codes(name) a text column's codes and dictionary, and column(name) either
+    kind, with text decoded to a list of str. Release returned views before
+    close(); the mapping stays open while any is alive.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            n = len(COLUMNAR_MAGIC)
+            if self._map[:n] != COLUMNAR_MAGIC:
+                raise ValueError(f"{path} is not a columnar SVRCALD file")
+            size = int.from_bytes(self._map[n:n + 4], "little")
+            header = json.loads(self._map[n + 4:n + 4 + size])
+            if header.get("version") != COLUMNAR_VERSION:
+                raise ValueError(f"{path}: unsupported columnar version {header.get('version')}")
+        except BaseException:
+            self._map.close()
+            raise
+        self.mode = header["mode"]
+        self.rows = header["rows"]
+        self._columns = {column["name"]: column for column in header["columns"]}
+        self._data = n + 4 + size + (-(n + 4 + size) % 8)
+        self._dictionaries = {}
+
+    @property
+    def names(self):
+        return list(self._columns)
+
+    def __len__(self):
+        return self.rows
+
+    def _view(self, offset, typecode, count):
+        start = self._data + offset
+        view = memoryview(self._map)[start:start + count * array(typecode).itemsize].cast(typecode)
+        if sys.byteorder != "little":
+            data = array(typecode, view)
+            data.byteswap()
+            return memoryview(data)
+        return view
+
+    def numbers(self, name):
+        column = self._columns[name]
+        if column["type"] != "f8":
+            raise ValueError(f"{name} is a text column")
+        return self._view(column["offset"], "d", self.rows)
+
+    def codes(self, name):
+        """(codes, dictionary): the value of row i is dictionary[codes[i]]."""
+        column = self._columns[name]
+        if column["type"] != "dict":
+            raise ValueError(f"{name} is a number column")
+        values = self._dictionaries.get(name)
+        if values is None:
+            offset, size, count = column["dictionary"]
+            start = self._data + offset
+            values = self._map[start:start + size].decode("utf-8").split("\n") if count else []
+            self._dictionaries[name] = values
+        return self._view(column["offset"], column["codes"], self.rows), values
+
+    def column(self, name):
+        if self._columns[name]["type"] == "f8":
+            return self.numbers(name)
+        codes, values = self.codes(name)
+        return list(map(values.__getitem__, codes))
+
+    def parsed_run(self):
+        """The ParsedRun of these rows, for rate scenarios without the report."""
+        run = ParsedRun(self.mode, self.path)
+        run.resident_ftes.frombytes(self.numbers("Resident FTES").cast("B"))
+        codes, labels = self.codes("SCFF_FTES")
+        category = [SCFF_LABELS.index(label) if label in SCFF_LABELS else SCFF_UNKNOWN for label in labels]
+        run.category.extend(map(category.__getitem__, codes))
+        return run
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:
+            pass        # views are still in use; the mapping is released with them
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ── Run-to-run diff ─────────────────────────────────────────────────────────
+#
+# Reconciles two extracts (e.g. P1 vs P2) enrollment by enrollment. The smaller
+# report is parsed into a hash index keyed by (Term, CRN, Student ID) and the
+# larger one is streamed against it, popping matches as it goes, so the work is
+# linear and memory is bounded by the smaller run. Whatever is left in the index
+# afterwards exists only in the indexed run.
+
+# (column, StudentRow attribute, number format or None for text)
+DIFF_FIELDS = (
+    ("Resident Contact Hours", "res_hrs", ".2f"),
+    ("Non-Resident Contact Hours", "non_res_hrs", ".2f"),
+    ("Resident FTES", "resident_ftes", ".4f"),
+    ("Non-Resident FTES", "non_resident_ftes", ".4f"),
+    ("Total FTES", "total_ftes", ".4f"),
+    ("Res Code", "res_code", None),
+    ("Res Ind", "res_ind", None),
+    ("SCFF_FTES", "scff_label", None),
+    ("FTES_$", "ftes_dollars", ".2f"),
+)
+
+DIFF_FIELDNAMES = ["Change", "Term", "CRN", "Subject", "Crse", "Student ID", "Changed Fields"]
+for _column, _, _fmt in DIFF_FIELDS:
+    DIFF_FIELDNAMES += [f"{_column} (Old)", f"{_column} (New)"] + ([f"{_column} Delta"] if _fmt else [])
+del _column, _fmt
+
+_diff_values = attrgetter(*(attr for _, attr, _ in DIFF_FIELDS))
+
+
+@dataclass
+class DiffResult:
+    old_path: str
+    new_path: str
+    output_file_path: str
+    added: int = 0
+    dropped: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    ftes_dollars_delta: float = 0.0     # sum of the printed FTES_$ deltas
+
+
+def iter_rows(file_path, mode, rates, encoding=None):
+    """Parse a report into StudentRows without writing any output files."""
+    with open_report(file_path, encoding) as source:
+        yield from PARSERS[mode][0](source.lines(), rates, Diagnostics())
+
+
+def _printed(row, attr, fmt):
+    value = getattr(row, attr)
+    return format(value, fmt) if fmt else value
+
+
+def diff_row(change, old, new):
+    """
+    One DIFF_FIELDNAMES row. ``old`` or ``new`` is None for an added or dropped
+    enrollment, whose numeric deltas are then taken against zero. Fields are
+    compared and subtracted as printed, so the deltas add up in a spreadsheet.
+    Returns (row, FTES_$ delta).
+    """
+    section = (new or old).section
+    values = [change, section.term, section.crn, section.subject, section.crse, (new or old).student_id, ""]
+    changed = []
+    ftes_dollars_delta = 0.0
+    for column, attr, fmt in DIFF_FIELDS:
+        before = _printed(old, attr, fmt) if old is not None else ""
+        after = _printed(new, attr, fmt) if new is not None else ""
+        values += (before, after)
+        if fmt:
+            delta = float(after or 0) - float(before or 0)
+            values.append(format(delta, fmt))
+            if attr == "ftes_dollars":
+                ftes_dollars_delta = float(format(delta, fmt))
+        if old is not None and new is not None and before != after:
+            changed.append(column)
+    values[6] = "; ".join(changed)
+    return values, ftes_dollars_delta
+
+
+def diff_runs(old_path, new_path, mode, rates, output_dir=".", name=None, encoding=None):
+    """
+    Compare two reports processed in the same ``mode`` with the same ``rates``
+    and write ``diff_<mode>_*.csv``: one row per added, dropped or changed
+    enrollment (unchanged ones are only counted). A student listed more than
+    once under the same section is matched in order of appearance.
+    """
+    index_old = os.path.getsize(old_path) <= os.path.getsize(new_path)
+    indexed, streamed = (old_path, new_path) if index_old else (new_path, old_path)
+
+    index = {}
+    for row in iter_rows(indexed, mode, rates, encoding):
+        key = (row.section.term, row.section.crn, row.student_id)
+        entry = index.get(key)
+        if entry is None:
+            index[key] = row
+        elif type(entry) is list:
+            entry.append(row)
+        else:
+            index[key] = [entry, row]
+
+    output_file_path = os.path.join(output_dir, f"diff_{mode}_{_output_suffix(name)}.csv")
+    result = DiffResult(old_path, new_path, output_file_path)
+    with open(output_file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(DIFF_FIELDNAMES)
+
+        def emit(change, old, new):
+            if change == "changed" and _diff_values(old) == _diff_values(new):
+                result.unchanged += 1
+                return
+            values, ftes_dollars_delta = diff_row(change, old, new)
+            if change == "changed" and not values[6]:      # differs only below the printed precision
+                result.unchanged += 1
+                return
+            setattr(result, change, getattr(result, change) + 1)
+            result.ftes_dollars_delta += ftes_dollars_delta
+            writer.writerow(values)
+
+        only_streamed, only_indexed = ("added", "dropped") if index_old else ("dropped", "added")
+        for row in iter_rows(streamed, mode, rates, encoding):
+            key = (row.section.term, row.section.crn, row.student_id)
+            match = index.get(key)
+            if match is None:
+                emit(only_streamed, *((None, row) if index_old else (row, None)))
+                continue
+            if type(match) is list:
+                other = match.pop(0)
+                if not match:
+                    del index[key]
+            else:
+                other = match
+                del index[key]
+            emit("changed", *((other, row) if index_old else (row, other)))
+
+        for match in index.values():
+            for other in (match if type(match) is list else (match,)):
+                emit(only_indexed, *((other, None) if index_old else (None, other)))
+    result.ftes_dollars_delta = round(result.ftes_dollars_delta, 2)
+    return result
+
+
+# ── Student index ───────────────────────────────────────────────────────────
+#
+# An in-memory index over the rows of one or more runs for ad-hoc questions
+# ("these 500 students", "students over N FTES this term"). Rows are stored
+# column-wise in arrays, with sections, Student IDs and the row-level text
+# fields dictionary-encoded; rows are grouped by student and by CRN through
+# offset tables, and per-student totals (overall and per term) are computed
+# once, with a sorted order per measure for threshold queries. Loading a run
+# replaces the Term/CRN sections it contains, as the SQLite sink does.
+
+INDEX_VERSION = 1
+INDEX_MEASURES = ("resident_ftes", "total_ftes", "ftes_dollars")
+_INDEX_NUMBERS = ("res_enrl", "res_hrs", "non_res_enrl", "non_res_hrs", "resident_ftes",
+                  "non_resident_ftes", "total_ftes", "eligible_hrs", "ftes_dollars")
+_index_numbers = attrgetter(*_INDEX_NUMBERS)
+_index_attrs = attrgetter("student_type", "reg_stat", "special_admit", "res_code", "res_ind", "scff_label")
+
+
+@dataclass
+class StudentTotals:
+    rows: int
+    resident_ftes: float
+    total_ftes: float
+    ftes_dollars: float
+
+
+def iter_csv_rows(file_path):
+    """Read a student_data_*.csv written by process_file() back into StudentRows."""
+    with open(file_path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        mode = next((m for m, (_, fieldnames) in PARSERS.items() if header == fieldnames), None)
+        if mode is None:
+            raise ValueError(f"{file_path} is not a student data CSV")
+        h = 10 if mode == "nonstd" else 9               # columns before Student ID
+        t = h + 6 + (4 if mode == "nonstd" else 5)      # ... and before Resident Enrollment
+        sections = {}
+        for values in reader:
+            key = (*values[:h], *values[h + 6:t])
+            section = sections.get(key)
+            if section is None:
+                if mode == "nonstd":
+                    term, subject, crse, crn, cmp_code, ins_mthd, *dates = values[:h]
+                    cr_ind, pe_ind, cdcp_ind, acct_method = values[h + 6:t]
+                    section = Section(mode, term, subject, crse, crn, cmp_code, *dates,
+                                      cr_ind, pe_ind, cdcp_ind, acct_method, ins_mthd=ins_mthd)
+                else:
+                    term, subject, crse, crn, cmp_code, *dates = values[:h]
+                    cr_ind, pe_ind, cdcp_ind, acct_method, tlm = values[h + 6:t]
+                    section = Section(mode, term, subject, crse, crn, cmp_code, *dates,
+                                      cr_ind, pe_ind, cdcp_ind, acct_method, tlm=float(tlm))
+                sections[key] = section
+            yield StudentRow(section, *values[h:h + 6], *map(float, values[t:t + 9]), values[t + 9])
+
+
+class StudentIndex:
+    """
+    Rows of one or more runs (one accounting mode), indexed by Student ID and
+    by CRN. Load with add_report(), add_csv() or add_rows(); loading a run
+    replaces the Term/CRN sections already loaded from earlier runs. Queries
+    return StudentRows and StudentTotals; save() and load() persist the built
+    index (a pickle: only load files you wrote).
+    """
+
+    def __init__(self, mode=None):
+        self.mode = mode
+        self.sources = []
+        self._sections = []             # Section per section code
+        self._key_sections = {}         # (term, crn) -> ([section codes], load number)
+        self._students, self._student_codes = [], {}
+        self._attrs, self._attr_codes = [], {}
+        self._section = array('i')      # per row: section code, student code, attrs code, numbers
+        self._student = array('i')
+        self._attr = array('i')
+        self._numbers = {name: array('d') for name in _INDEX_NUMBERS}
+        self._built = None
+
+    # ── Loading ─────────────────────────────────────────────────────────
+
+    def add_rows(self, rows, source=None):
+        """Add the StudentRows of one run."""
+        load = len(self.sources)
+        self.sources.append(source)
+        sections, key_sections, student_codes, attr_codes = {}, self._key_sections, self._student_codes, self._attr_codes
+        section_col, student_col, attr_col = self._section.append, self._student.append, self._attr.append
+        number_cols = [self._numbers[name].append for name in _INDEX_NUMBERS]
+        for row in rows:
+            code = sections.get(row.section)
+            if code is None:
+                section = row.section
+                if self.mode is None:
+                    self.mode = section.mode
+                elif section.mode != self.mode:
+                    raise ValueError(f"cannot index {section.mode} rows with {self.mode} rows")
+                code = sections[section] = len(self._sections)
+                self._sections.append(section)
+                codes, seen_in = key_sections.get((section.term, section.crn), ([], load))
+                if seen_in != load:
+                    codes = []          # first time this run has the section: earlier loads are replaced
+                codes.append(code)
+                key_sections[(section.term, section.crn)] = (codes, load)
+            section_col(code)
+            student = student_codes.get(row.student_id)
+            if student is None:
+                student = student_codes[row.student_id] = len(self._students)
+                self._students.append(row.student_id)
+            student_col(student)
+            attrs = _index_attrs(row)
+            attr = attr_codes.get(attrs)
+            if attr is None:
+                attr = attr_codes[attrs] = len(self._attrs)
+                self._attrs.append(attrs)
+            attr_col(attr)
+            for append, value in zip(number_cols, _index_numbers(row)):
+                append(value)
+        self._built = None
+
+    def add_report(self, file_path, mode, rates=None, encoding=None):
+        """Parse a report (rates default to DEFAULT_RATES) and add its rows."""
+        self.add_rows(iter_rows(file_path, mode, rates or DEFAULT_RATES[mode], encoding), file_path)
+
+    def add_csv(self, file_path):
+        """Add the rows of a student_data_*.csv written by process_file()."""
+        self.add_rows(iter_csv_rows(file_path), file_path)
+
+    # ── Building ────────────────────────────────────────────────────────
+
+    def _build(self):
+        """Drop replaced sections, then compute the offset tables and totals."""
+        live_sections = sorted(code for codes, _ in self._key_sections.values() for code in codes)
+        if len(live_sections) < len(self._sections):
+            self._compact(live_sections)
+
+        n_students = len(self._students)
+        by_student_start, by_student = _group_offsets(self._student, n_students)
+        crns = sorted({section.crn for section in self._sections})
+        crn_codes = {crn: i for i, crn in enumerate(crns)}
+        section_crn = [crn_codes[section.crn] for section in self._sections]
+        by_crn_start, by_crn = _group_offsets(array('i', map(section_crn.__getitem__, self._section)), len(crns))
+
+        # Totals per student, overall (key None) and per term; a (term, student) pair is coded t * n + s
+        terms = sorted({section.term for section in self._sections})
+        term_codes = {term: t for t, term in enumerate(terms)}
+        term_of_section = [term_codes[section.term] for section in self._sections]
+        measures = [self._numbers[name] for name in INDEX_MEASURES]
+        totals = {None: _ranked_totals(n_students, *_sum_by(self._student, measures))}
+        keys, columns = _sum_by([term_of_section[c] * n_students + s for c, s in zip(self._section, self._student)],
+                                measures)
+        for t, term in enumerate(terms):
+            a, b = bisect_left(keys, t * n_students), bisect_left(keys, (t + 1) * n_students)
+            totals[term] = _ranked_totals(n_students, array('i', (k - t * n_students for k in keys[a:b])),
+                                          [column[a:b] for column in columns])
+        self._built = {"by_student": (by_student_start, by_student), "crns": crn_codes,
+                       "by_crn": (by_crn_start, by_crn), "totals": totals}
+
+    def _compact(self, live_sections):
+        remap = dict.fromkeys(range(len(self._sections)), -1)
+        for new, old in enumerate(live_sections):
+            remap[old] = new
+        keep = [r for r, code in enumerate(self._section) if remap[code] >= 0]
+        self._sections = [self._sections[code] for code in live_sections]
+        self._key_sections = {key: ([remap[c] for c in codes], load)
+                              for key, (codes, load) in self._key_sections.items()}
+        self._section = array('i', (remap[self._section[r]] for r in keep))
+        self._student = array('i', map(self._student.__getitem__, keep))
+        self._attr = array('i', map(self._attr.__getitem__, keep))
+        self._numbers = {name: array('d', map(column.__getitem__, keep)) for name, column in self._numbers.items()}
+
+    def _index(self):
+        if self._built is None:
+            self._build()
+        return self._built
+
+    # ── Queries ─────────────────────────────────────────────────────────
+
+    def __len__(self):
+        self._index()
+        return len(self._section)
+
+    def __contains__(self, student_id):
+        """True if the student has rows; students whose sections were all replaced are not in the index."""
+        s = self._student_codes.get(student_id)
+        return s is not None and self._index()["totals"][None][3][s] >= 0
+
+    @property
+    def terms(self):
+        return sorted(key for key in self._index()["totals"] if key is not None)
+
+    def _row(self, r):
+        res_enrl, res_hrs, non_res_enrl, non_res_hrs, resident_ftes, non_resident_ftes, total_ftes, \
+            eligible_hrs, ftes_dollars = [column[r] for column in self._numbers.values()]
+        student_type, reg_stat, special_admit, res_code, res_ind, scff_label = self._attrs[self._attr[r]]
+        return StudentRow(self._sections[self._section[r]], self._students[self._student[r]], student_type,
+                          reg_stat, special_admit, res_code, res_ind, res_enrl, res_hrs, non_res_enrl, non_res_hrs,
+                          resident_ftes, non_resident_ftes, total_ftes, eligible_hrs, ftes_dollars, scff_label)
+
+    def enrollments(self, student_ids, term=None):
+        """{student_id: [StudentRow, ...]} for the given students (optionally one term); unknown IDs are left out."""
+        start, rows = self._index()["by_student"]
+        result = {}
+        for student_id in student_ids:
+            s = self._student_codes.get(student_id)
+            if s is not None:
+                found = [self._row(r) for r in rows[start[s]:start[s + 1]]]
+                if term is not None:
+                    found = [row for row in found if row.section.term == term]
+                if found:
+                    result[student_id] = found
+        return result
+
+    def section_rows(self, crn, term=None):
+        """StudentRows of a CRN, across all loaded terms unless ``term`` is given."""
+        index = self._index()
+        c = index["crns"].get(crn)
+        if c is None:
+            return []
+        start, rows = index["by_crn"]
+        found = [self._row(r) for r in rows[start[c]:start[c + 1]]]
+        return found if term is None else [row for row in found if row.section.term == term]
+
+    def totals(self, student_ids, term=None):
+        """{student_id: StudentTotals} for the given students, overall or for one term."""
+        totals = self._index()["totals"].get(term)
+        if totals is None:
+            return {}
+        position, (rows, resident_ftes, total_ftes, ftes_dollars) = totals[3], totals[1]
+        result = {}
+        for student_id in student_ids:
+            s = self._student_codes.get(student_id)
+            if s is not None and (p := position[s]) >= 0:
+                result[student_id] = StudentTotals(rows[p], resident_ftes[p], total_ftes[p], ftes_dollars[p])
+        return result
+
+    def students_over(self, threshold, measure="total_ftes", term=None):
+        """[(student_id, total)] of students whose ``measure`` total exceeds ``threshold``, largest first."""
+        if measure not in INDEX_MEASURES:
+            raise ValueError(f"measure must be one of {', '.join(INDEX_MEASURES)}")
+        totals = self._index()["totals"].get(term)
+        if totals is None:
+            return []
+        values, students = totals[2][measure]
+        names = self._students
+        return [(names[students[p]], values[p]) for p in range(len(values) - 1, bisect_right(values, threshold) - 1, -1)]
+
+    # ── Persistence ─────────────────────────────────────────────────────
+
+    def save(self, path):
+        """Write the built index to ``path``."""
+        state = {
+            "version": INDEX_VERSION, "mode": self.mode, "sources": self.sources,
+            "sections": [section.state() for section in self._sections], "key_sections": self._key_sections,
+            "students": self._students, "attrs": self._attrs, "section": self._section,
+            "student": self._student, "attr": self._attr, "numbers": self._numbers, "built": self._index(),
+        }
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by save(); it is ready to query without rebuilding."""
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if not isinstance(state, dict) or state.get("version") != INDEX_VERSION:
+            raise ValueError(f"{path} is not a student index of version {INDEX_VERSION}")
+        index = cls(state["mode"])
+        index.sources = state["sources"]
+        index._sections = [Section(*s) for s in state["sections"]]
+        index._key_sections = state["key_sections"]
+        index._students = state["students"]
+        index._student_codes = {student_id: s for s, student_id in enumerate(index._students)}
+        index._attrs = state["attrs"]
+        index._attr_codes = {attrs: a for a, attrs in enumerate(index._attrs)}
+        index._section, index._student, index._attr = state["section"], state["student"], state["attr"]
+        index._numbers = state["numbers"]
+        index._built = state["built"]
+        return index
+
+
+def _group_offsets(codes, n_groups):
+    """
+    Stable counting sort of row numbers by ``codes``: returns (start, rows),
+    where the rows of group g are rows[start[g]:start[g + 1]] in input order.
+    """
+    start = array('i', [0]) * (n_groups + 1)
+    for code in codes:
+        start[code + 1] += 1
+    for g in range(n_groups):
+        start[g + 1] += start[g]
+    fill = array('i', start)
+    rows = array('i', [0]) * len(codes)
+    for r, code in enumerate(codes):
+        rows[fill[code]] = r
+        fill[code] += 1
+    return start, rows
+
+
+def _sum_by(keys, columns):
+    """Row count and column sums per distinct key: (sorted keys, [counts, *sums]) as arrays."""
+    counts = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + 1
+    sums = []
+    for column in columns:
+        total = dict.fromkeys(counts, 0.0)
+        for key, value in zip(keys, column):
+            total[key] += value
+        sums.append(total)
+    ordered = sorted(counts)
+    return (array('i', ordered), [array('i', map(counts.__getitem__, ordered))]
+            + [array('d', map(total.__getitem__, ordered)) for total in sums])
+
+
+def _ranked_totals(n_students, students, columns):
+    """
+    (students, columns, {measure: (ascending totals, their students)},
+    position of each student code in ``students`` or -1) for StudentIndex queries.
+    """
+    ranked = {}
+    for measure, column in zip(INDEX_MEASURES, columns[1:]):
+        order = sorted(range(len(students)), key=column.__getitem__)
+        ranked[measure] = (array('d', map(column.__getitem__, order)), array('i', map(students.__getitem__, order)))
+    position = array('i', [-1]) * n_students
+    for p, s in enumerate(students):
+        position[s] = p
+    return students, columns, ranked, position
+
+
+# ── Rate scenarios ──────────────────────────────────────────────────────────
+#
+# FTES and SCFF categories do not depend on the funding rates, so a processed
+# report can be kept as a compact ParsedRun and FTES_$ recomputed for any
+# number of rate sets without reading the report again.
+
+class ParsedRun:
+    """
+    The rate-independent result of one processed report: per output row, the
+    resident FTES and the SCFF category code (which already reflects the credit,
+    special admit and CDCP flags).
+    """
+
+    __slots__ = ("mode", "file_path", "resident_ftes", "category")
+
+    def __init__(self, mode, file_path=None):
+        self.mode = mode
+        self.file_path = file_path
+        self.resident_ftes = array('d')
+        self.category = array('b')
+
+    def __len__(self):
+        return len(self.category)
+
+    @classmethod
+    def from_bytes(cls, mode, resident_ftes, category):
+        run = cls(mode)
+        run.resident_ftes.frombytes(resident_ftes)
+        run.category.frombytes(category)
+        return run
+
+    def append_run(self, other):
+        self.resident_ftes.extend(other.resident_ftes)
+        self.category.extend(other.category)
+
+    def extend(self, columns, result):
+        """Append one computed batch (a StudentColumns and its FtesColumns)."""
+        self.resident_ftes.extend(result.resident_ftes)
+        self.category.extend(columns.category)
+
+    def funding(self, rates):
+        """Per-row FTES_$ under ``rates``, identical to calculate_funding_and_label()."""
+        if np is not None and len(self) >= NUMPY_MIN_BATCH:
+            rate_by_category = np.array([rates[key] if key else 0.0 for key in SCFF_RATE_KEYS])
+            category = np.frombuffer(self.category, dtype=np.int8)
+            resident_ftes = np.frombuffer(self.resident_ftes, dtype=np.float64)
+            return array('d', np.where(category == SCFF_UNKNOWN, 0.0,
+                                       resident_ftes * rate_by_category[category]).tobytes())
+        rate_by_category = [rates[key] if key else 0 for key in SCFF_RATE_KEYS]
+        return array('d', [ftes * rate_by_category[c] if c else 0.0
+                           for ftes, c in zip(self.resident_ftes, self.category)])
+
+    def totals(self, rates):
+        """
+        Rows, resident FTES and FTES_$ per SCFF category under ``rates``.
+        Returns {label: (rows, resident_ftes, ftes_dollars)} in SCFF_LABELS order.
+        """
+        rows = [0] * len(SCFF_LABELS)
+        ftes = [0.0] * len(SCFF_LABELS)
+        dollars = [0.0] * len(SCFF_LABELS)
+        for c, f, d in zip(self.category, self.resident_ftes, self.funding(rates)):
+            rows[c] += 1
+            ftes[c] += f
+            dollars[c] += d
+        return {label: (rows[c], ftes[c], dollars[c]) for c, label in enumerate(SCFF_LABELS)}
+
+
+def parse_run(file_path, mode, encoding=None):
+    """Parse a report into a ParsedRun only, without writing any output files."""
+    parse, _ = PARSERS[mode]
+    run = ParsedRun(mode, file_path)
+    with open_report(file_path, encoding) as source:
+        for _ in parse(source.lines(), DEFAULT_RATES[mode], Diagnostics(), run):
+            pass
+    return run
+
+
+SCENARIO_FIELDNAMES = ["Scenario", "SCFF_FTES", "Rate", "Rows", "Resident FTES", "FTES_$"]
+
+
+def scenario_totals(run, scenarios):
+    """
+    Recompute FTES_$ for every named rate set in ``scenarios`` ({name: rates}).
+    Yields one row dict per scenario and SCFF category, plus a "Total" row per scenario.
+    """
+    for name, rates in scenarios.items():
+        all_rows = all_ftes = all_dollars = 0
+        for c, (label, (rows, ftes, dollars)) in enumerate(run.totals(rates).items()):
+            key = SCFF_RATE_KEYS[c]
+            yield {
+                "Scenario": name, "SCFF_FTES": label,
+                "Rate": f"{rates[key]:.2f}" if key else "",
+                "Rows": rows, "Resident FTES": f"{ftes:.4f}", "FTES_$": f"{dollars:.2f}",
+            }
+            all_rows += rows
+            all_ftes += ftes
+            all_dollars += dollars
+        yield {
+            "Scenario": name, "SCFF_FTES": "Total", "Rate": "",
+            "Rows": all_rows, "Resident FTES": f"{all_ftes:.4f}", "FTES_$": f"{all_dollars:.2f}",
+        }
+
+
+def write_scenario_totals(path, run, scenarios):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SCENARIO_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(scenario_totals(run, scenarios))
+    return path
+
+
+def load_scenarios(path, mode):
+    """
+    Read named rate sets from a JSON object {name: rates}, where each rates
+    entry has the same forms accepted by load_rates(). Errors name ``path``.
+    """
+    with open(path, 'r') as f:
+        try:
+            data = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from e
+    if not isinstance(data, dict) or not data:
+        raise ValueError(f"{path}: scenarios file must be a JSON object of name -> rates")
+    scenarios = {}
+    for name, rates in data.items():
+        try:
+            scenarios[name] = _rates_from_json(rates, mode)
+        except ValueError as e:
+            raise ValueError(f"{path}: scenario {name!r}: {e}") from e
+    return scenarios
+
+
+# ── Section cache ───────────────────────────────────────────────────────────
+#
+# Parser state resets at every course header, so a report splits into
+# independent course blocks (a header line plus the lines under it; any lines
+# before the first header form a block of their own). Each block is hashed and
+# its parsed rows (see pack_rows()), ParsedRun columns and counts are cached in
+# a SQLite file under that hash. FTES_$ is recomputed from the cached resident
+# FTES on every use, so a rate change does not invalidate the cache.
+
+CACHE_VERSION = 3           # bump whenever parsing or the cached row format changes
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".svrcald_cache")
+
+
+def iter_blocks(lines, mode):
+    """Group report lines into course blocks, yielding each block as a list of lines."""
+    digits = LAYOUTS[mode]["header_digits"]
+    block = []
+    for line in lines:
+        if block and len(line) >= digits and line[:digits].isdecimal():
+            yield block
+            block = []
+        block.append(line)
+    if block:
+        yield block
+
+
+class _BlockStats(Diagnostics):
+    """Captures the end-of-block counts a parser reports, without writing anything."""
+
+    def __init__(self, metrics=None):
+        super().__init__(metrics=metrics)
+        self.counts = (0, 0, 0, 0, 0)
+
+    def summary(self, lines, headers, rows, skipped, unknown_methods):
+        self.counts = (lines, headers, rows, skipped, unknown_methods)
+
+
+class BlockCache:
+    """
+    On-disk cache of parsed course blocks: a single SQLite file in
+    ``directory`` mapping block hash -> pickled entry, with eviction by age
+    and total size (least recently used first). Entries hold only plain
+    Python types so they load in any process.
+    """
+
+    FILENAME = "svrcald_blocks.sqlite"
+    COMMIT_EVERY = 500
+
+    def __init__(self, directory, max_age_days=30, max_bytes=512 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, self.FILENAME)
+        self.max_age = max_age_days * 86400
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(self.path, timeout=60)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS blocks ("
+            " key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS blocks_used ON blocks (used)")
+        self._db.commit()
+        self._used = []
+        self._pending = 0
+
+    def key_prefix(self, mode):
+        """Hash state covering everything besides the block text that affects its result."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{CACHE_VERSION}|{mode}|{LAYOUTS[mode]!r}|".encode())
+        return h
+
+    def get(self, key):
+        row = self._db.execute("SELECT data FROM blocks WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            entry = pickle.loads(row[0])
+        except Exception:
+            return None
+        self._used.append(key)
+        return entry
+
+    def put(self, key, entry):
+        data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        self._db.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?)", (key, data, len(data), time()))
+        self._pending += 1
+        if self._pending >= self.COMMIT_EVERY:
+            self.flush()
+
+    def flush(self):
+        if self._used:
+            now = time()
+            self._db.executemany("UPDATE blocks SET used = ? WHERE key = ?", ((now, k) for k in self._used))
+            self._used = []
+        self._db.commit()
+        self._pending = 0
+
+    def prune(self):
+        """Drop entries unused for max_age, then the least recently used until under max_bytes."""
+        self.flush()
+        self._db.execute("DELETE FROM blocks WHERE used < ?", (time() - self.max_age,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blocks").fetchone()[0]
+        if total > self.max_bytes:
+            doomed = []
+            for key, size in self._db.execute("SELECT key, size FROM blocks ORDER BY used"):
+                if total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                total -= size
+            self._db.executemany("DELETE FROM blocks WHERE key = ?", doomed)
+        self._db.commit()
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+
+def parse_records_cached(mode, lines, rates, diagnostics, cache, run=None):
+    """
+    Same rows as PARSERS[mode] would yield, but each course block is looked up
+    in ``cache`` first and only parsed when its content has changed. Per-line
+    diagnostics ("skipped"/"trace") are not available from cached blocks, so
+    callers should parse directly at those levels.
+    """
+    parse = PARSERS[mode][0]
+    prefix = cache.key_prefix(mode)
+    totals = [0, 0, 0, 0, 0]
+    blocks = reused = line_base = 0
+    for block in iter_blocks(lines, mode):
+        h = prefix.copy()
+        h.update('\n'.join(block).encode('utf-8', 'surrogatepass'))
+        key = h.hexdigest()
+        entry = cache.get(key)
+        if entry is None:
+            block_run, stats = ParsedRun(mode), _BlockStats(diagnostics.metrics)
+            try:
+                rows = list(parse(block, rates, stats, block_run))
+            except ReportParseError as e:
+                raise e.shifted(line_base) from None
+            entry = (pack_rows(rows), block_run.resident_ftes.tobytes(), block_run.category.tobytes(),
+                     stats.counts)
+            cache.put(key, entry)
+        else:
+            rows = unpack_rows(*entry[0])
+            reused += 1
+
+        _, resident_ftes, category, counts = entry
+        block_run = ParsedRun.from_bytes(mode, resident_ftes, category)
+        if run is not None:
+            run.append_run(block_run)
+        # FTES_$ is the only rate-dependent value, so cached rows are refreshed with the current rates
+        for row, ftes_dollars in zip(rows, block_run.funding(rates)):
+            row.ftes_dollars = ftes_dollars
+            yield row
+        blocks += 1
+        line_base += len(block)
+        totals = [a + b for a, b in zip(totals, counts)]
+
+    cache.flush()
+    diagnostics.summary(*totals)
+    if diagnostics.enabled:
+        diagnostics.write(f"Section cache: {blocks} blocks, {reused} reused, {blocks - reused} parsed")
+
+
+# ── Parallel chunked parsing ────────────────────────────────────────────────
+#
+# Parser state resets at every course header, so one large report can be cut
+# at header lines into chunks that parse independently. Chunks are parsed in a
+# process pool and their rows are yielded back in file order, so the output is
+# byte-for-byte what the serial parser produces.
+
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024        # smaller reports are not worth a pool
+PARALLEL_CHUNK_BYTES = 4 * 1024 * 1024       # upper bound; smaller reports get about two chunks per worker
+
+
+def chunk_size(size, workers):
+    """Chunk size giving every worker about two chunks, capped at PARALLEL_CHUNK_BYTES."""
+    return max(1, min(PARALLEL_CHUNK_BYTES, -(-size // (2 * workers))))
+
+
+def find_chunk_offsets(file_path, chunk_bytes=PARALLEL_CHUNK_BYTES, header_digits=6):
+    """
+    Byte offsets [0, ..., size] cutting the file into pieces of roughly
+    ``chunk_bytes``. Every cut lies just after a newline that is followed by
+    ``header_digits`` ASCII digits, i.e. at the start of a course header line.
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= chunk_bytes:
+            return [0, size]
+        offsets = [0]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = chunk_bytes
+            while pos < size:
+                nl = mm.find(b"\n", pos)
+                while nl != -1:
+                    term = mm[nl + 1:nl + 1 + header_digits]
+                    if len(term) == header_digits and term.isdigit():
+                        break
+                    nl = mm.find(b"\n", nl + 1)
+                if nl == -1:
+                    break
+                offsets.append(nl + 1)
+                pos = nl + 1 + chunk_bytes
+        offsets.append(size)
+    return offsets
+
+
+def chunkable_encoding(encoding):
+    """True if newline and digits encode as single ASCII bytes, so byte offsets can cut lines."""
+    try:
+        return "\n0123456789".encode(encoding) == b"\n0123456789"
+    except LookupError:
+        return False
+
+
+def _parse_chunk(file_path, start, end, mode, rates, encoding, want_run):
+    """Process-pool entry point: parse bytes [start, end) of the report."""
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    try:
+        text = data.decode(encoding)
+    except UnicodeDecodeError as e:
+        raise ReportReadError(e) from e
+    del data
+
+    parse = PARSERS[mode][0]
+    stats = _BlockStats()
+    run = ParsedRun(mode) if want_run else None
+    rows = pack_rows(parse(text.splitlines(), rates, stats, run))
+    arrays = (run.resident_ftes.tobytes(), run.category.tobytes()) if run else None
+    return rows, stats.counts, arrays
+
+
+def parse_records_parallel(mode, file_path, rates, diagnostics, workers, run=None,
+                           chunk_bytes=None, encoding=None, status=None, progress=None):
+    """
+    Same rows as PARSERS[mode] would yield for ``file_path``, parsed in chunks
+    by a pool of ``workers`` processes. Chunks are ``chunk_bytes`` long
+    (default: chunk_size() for the file). At most ``workers + 1`` chunks are
+    in flight (queued, being parsed, or parsed and waiting their turn), so on
+    top of the serial path's memory the parent holds the rows of at most
+    ``workers + 2`` chunks, each roughly 3-4 times the chunk's size on disk:
+    about 100 MB with 4 workers and 4 MB chunks, whatever the report's size.
+    Per-line diagnostics are not collected; callers should parse serially at
+    the "skipped" and "trace" levels. ``progress(status)`` is called after
+    each chunk, as track_progress() does per PROGRESS_LINES lines.
+    """
+    encoding = report_encoding(encoding)
+    if chunk_bytes is None:
+        chunk_bytes = chunk_size(os.path.getsize(file_path), workers)
+    offsets = find_chunk_offsets(file_path, chunk_bytes, LAYOUTS[mode]["header_digits"])
+    chunks = iter(zip(offsets, offsets[1:]))
+    totals = [0, 0, 0, 0, 0]
+    n_chunks = len(offsets) - 1
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit(chunk):
+            return chunk[1], pool.submit(_parse_chunk, file_path, *chunk, mode, rates, encoding, run is not None)
+
+        in_flight = deque(submit(chunk) for chunk in islice(chunks, workers + 1))
+        while in_flight:
+            end, future = in_flight.popleft()
+            try:
+                rows, counts, arrays = future.result()
+            except ReportParseError as e:
+                raise e.shifted(totals[0]) from None   # chunks are collected in order
+            chunk = next(chunks, None)
+            if chunk is not None:
+                in_flight.append(submit(chunk))
+            if run is not None:
+                run.append_run(ParsedRun.from_bytes(mode, *arrays))
+            yield from unpack_rows(*rows)
+            totals = [a + b for a, b in zip(totals, counts)]
+            if progress is not None:
+                status.lines, status.bytes_done = totals[0], end
+                try:
+                    progress(status)
+                except ProcessingCancelled:
+                    pool.shutdown(cancel_futures=True)
+                    raise
+
+    diagnostics.summary(*totals)
+    if diagnostics.enabled:
+        diagnostics.write(f"Parallel parse: {n_chunks} chunks over {workers} worker processes")
+
+
+# ── Watch folder ────────────────────────────────────────────────────────────
+#
+# Service mode for folders that Banner jobs drop reports into. The folder is
+# polled (portable, and reliable on network shares where change notifications
+# are not); a file is taken once its size and mtime have stayed the same for
+# ``settle`` seconds and it can be opened, i.e. the writer has finished. Ready
+# files go through a bounded queue to a worker pool, and every outcome is
+# appended to a processed-files log so a restart skips what is already done.
+
+WATCH_PATTERNS = REPORT_PATTERNS
+
+
+class ProcessedLog:
+    """
+    Append-only JSON-lines record of processed files. A file is identified by
+    path, size and mtime, so a report replaced under the same name is picked
+    up again. Failures are recorded too and are retried only when the file
+    changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._done = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self._done.add((record["path"], record["size"], record["mtime_ns"]))
+                    except (ValueError, KeyError, TypeError):
+                        continue        # a line cut short by a crash
+
+    def __contains__(self, key):
+        return key in self._done
+
+    def add(self, key, **info):
+        path, size, mtime_ns = key
+        record = {"path": path, "size": size, "mtime_ns": mtime_ns,
+                  "processed": datetime.now().isoformat(timespec="seconds"), **info}
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+            self._done.add(key)
+
+
+def scan_folder(directory, patterns=WATCH_PATTERNS):
+    """Yield (path, size, mtime_ns) for the files in ``directory`` matching ``patterns`` (any case)."""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name.lower()
+            if any(fnmatch(name, pattern) for pattern in patterns) and entry.is_file():
+                stat = entry.stat()
+                yield os.path.abspath(entry.path), stat.st_size, stat.st_mtime_ns
+
+
+def _is_readable(path):
+    try:
+        with open(path, 'rb'):
+            return True
+    except OSError:         # e.g. still locked by the writer on Windows
+        return False
+
+
+def watch_folder(directory, mode, rates, output_dir=".", workers=1, *, poll_interval=5.0, settle=10.0,
+                 patterns=WATCH_PATTERNS, state_path=None, queue_size=None, stop=None, report=print,
+                 **options):
+    """
+    Process every report that appears in ``directory`` until ``stop`` (a
+    threading.Event) is set, then finish the queued work and return.
+    ``options`` are passed on as for process_batch(). Outcomes are passed to
+    ``report`` as text and logged to ``state_path`` (default:
+    processed_files.jsonl in ``output_dir``).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stop = stop or threading.Event()
+    log = ProcessedLog(state_path or os.path.join(output_dir, "processed_files.jsonl"))
+    work = queue.Queue(maxsize=queue_size or 2 * workers)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    in_progress, lock = set(), threading.Lock()
+    names, used_names = {}, set()       # path -> output name; x.lis and x.lis.gz must not share one
+
+    def output_name(path):
+        with lock:
+            if path not in names:
+                names[path] = _unique_name(report_stem(path), used_names)
+            return names[path]
+
+    def worker():
+        while (key := work.get()) is not None:
+            path = key[0]
+            job = (path, mode, rates, output_dir, output_name(path), dict(options))
+            try:
+                result, error = pool.submit(_batch_worker, *job).result() if pool else _batch_worker(*job)
+            except Exception as e:      # the pool itself failed, e.g. a worker process was killed
+                result, error = None, f"{type(e).__name__}: {e}"
+            if error:
+                log.add(key, error=error)
+                report(f"FAILED  {path}: {error}")
+            else:
+                log.add(key, rows=result.rows, output=os.path.abspath(result.output_file_path))
+                report(f"OK      {path}: {result.rows} rows -> {result.output_file_path}")
+            with lock:
+                in_progress.discard(key)
+
+    threads = [threading.Thread(target=worker, name=f"watch-worker-{i}", daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    unchanged_since = {}        # (path, size, mtime_ns) -> when first seen with exactly that size and mtime
+    report(f"Watching {os.path.abspath(directory)} for {', '.join(patterns)} "
+           f"(every {poll_interval:g}s, settle {settle:g}s, {workers} worker(s))")
+    try:
+        while not stop.is_set():
+            now = time()
+            current = {}
+            for key in scan_folder(directory, patterns):
+                if key in log or key in in_progress:
+                    continue
+                current[key] = since = unchanged_since.get(key, now)
+                if key[1] and now - since >= settle and _is_readable(key[0]):
+                    try:
+                        work.put_nowait(key)
+                    except queue.Full:
+                        continue        # stays pending; retried on the next poll
+                    with lock:
+                        in_progress.add(key)
+                    del current[key]
+            # Files that changed, were queued or disappeared start over
+            unchanged_since = current
+            stop.wait(poll_interval)
+    finally:
+        for _ in threads:
+            work.put(None)          # after the queued files, so they are still processed
+        for thread in threads:
+            thread.join()
+        if pool is not None:
+            pool.shutdown()
+
+
+# ── Batch / command line ────────────────────────────────────────────────────
 
 DEFAULT_RATES = {
     "nonstd": {"cdcp": 7424.53, "special_admit": 7424.53, "non_credit": 4464.58, "credit": 5294.42},
     "std":    {"cdcp": 7345.93, "special_admit": 7345.93, "non_credit": 4417.31, "credit": 5238.37},
 }
 
+RATE_KEYS = ("cdcp", "special_admit", "non_credit", "credit")
 
-class App(tk.Tk):
+
+def load_rates(path, mode):
+    """
+    Read funding rates from a JSON file. The file may hold the four rates
+    directly ({"cdcp": ..., "credit": ...}) or one such object per mode
+    ({"nonstd": {...}, "std": {...}}), in which case ``mode`` selects one.
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    try:
+        return _rates_from_json(data, mode)
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from e
+
+
+def _rates_from_json(data, mode):
+    if isinstance(data, dict) and isinstance(data.get(mode), dict):
+        data = data[mode]
+    try:
+        return {key: float(data[key]) for key in RATE_KEYS}
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"rates need numeric {', '.join(RATE_KEYS)} ({e})") from e
+
+
+def expand_inputs(patterns):
+    """Expand glob patterns (Windows shells do not) and drop duplicates, keeping order."""
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def _output_names(paths):
+    """Give every input a distinct output name based on its file stem."""
+    used = set()
+    return [_unique_name(report_stem(path), used) for path in paths]
+
+
+def _unique_name(stem, used):
+    """``stem``, or ``stem_2``, ``stem_3``, ... if taken; the name is added to ``used``."""
+    name, n = stem, 1
+    while name in used:
+        n += 1
+        name = f"{stem}_{n}"
+    used.add(name)
+    return name
+
+
+def _batch_worker(file_path, mode, rates, output_dir, name, options):
+    """Process-pool entry point: report failures as text so nothing unpicklable crosses back."""
+    try:
+        with ExitStack() as stack:
+            cache_settings = options.pop("cache", None)
+            if cache_settings:
+                options["cache"] = BlockCache(*cache_settings)
+                stack.callback(options["cache"].close)
+            sinks = []
+            if options.pop("summary", False):
+                sinks.append(SummarySink())
+            if options.pop("columnar", False):
+                sinks.append(ColumnarSink())
+            sqlite_path = options.pop("sqlite", None)
+            if sqlite_path:
+                sinks.append(SqliteSink(sqlite_path))
+                stack.callback(sinks[-1].close)
+            options["sinks"] = sinks
+            metrics = []
+            metrics_file = options.pop("metrics_file", None)
+            if metrics_file:
+                metrics.append(MetricsJsonFile(metrics_file))
+            if options.pop("log_metrics", False):
+                metrics.append(MetricsLogLine())
+            options["metrics"] = metrics
+            return process_file(file_path, mode, rates, output_dir, name, **options), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def process_batch(paths, mode, rates, output_dir=".", workers=None, **options):
+    """
+    Process many reports, spread over a pool of ``workers`` processes
+    (default: one per CPU; 1 runs everything in this process). ``options`` are
+    passed on to process_file(), except ``cache``, which is given as
+    BlockCache arguments (directory, max_age_days, max_bytes), ``sqlite``, a
+    database path for a SqliteSink, so every worker opens its own,
+    ``summary`` and ``columnar``, which add a SummarySink / ColumnarSink per
+    file, and ``metrics_file`` /
+    ``log_metrics``, which add a MetricsJsonFile / MetricsLogLine.
+    Yields (file_path, ProcessResult | None, error | None) as each file finishes.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(path, mode, rates, output_dir, name, dict(options))
+            for path, name in zip(paths, _output_names(paths))]
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield (job[0], *_batch_worker(*job))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_batch_worker, *job): job[0] for job in jobs}
+        for future in as_completed(futures):
+            try:
+                result, error = future.result()
+            except Exception as e:      # the pool itself failed, e.g. a worker process was killed
+                result, error = None, f"{type(e).__name__}: {e}"
+            yield futures[future], result, error
+
+
+def _encoding_arg(name):
+    try:
+        return report_encoding(name)
+    except LookupError:
+        raise argparse.ArgumentTypeError(f"unknown encoding: {name}") from None
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Extract student-level FTES from Detailed SVRCALD reports. "
+                    "Run without arguments to open the GUI.",
+    )
+    parser.add_argument("inputs", nargs="+", metavar="FILE",
+                        help="SVRCALD .lis/.txt files or glob patterns; .gz, .bz2 and .zip "
+                             "archives are read without extracting them")
+    parser.add_argument("--mode", choices=MODES, default="nonstd",
+                        help="accounting mode (default: nonstd); 'both' writes both CSVs from one pass")
+    parser.add_argument("--compare", action="store_true",
+                        help="with --mode both, also write a side-by-side Std vs NonStd comparison CSV")
+    parser.add_argument("--rates", metavar="JSON",
+                        help="funding rates file (default: built-in rates for the mode)")
+    parser.add_argument("--encoding", type=_encoding_arg, default=None,
+                        help="text encoding of the reports, e.g. cp1252 or utf-8 "
+                             "(default: the system's preferred encoding)")
+    parser.add_argument("--output-dir", default=".",
+                        help="directory for CSV and diagnostics files (default: current directory)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-workers", type=int, default=1, metavar="N",
+                        help="parse each large report in header-aligned chunks on N processes "
+                             "(default: 1, serial)")
+    parser.add_argument("--diagnostics", choices=DIAGNOSTIC_LEVELS, default="summary",
+                        help="diagnostics detail: off, summary (default), skipped rows, or a full trace")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="reuse parsed course sections whose text is unchanged since an earlier run")
+    parser.add_argument("--cache-max-age", type=float, default=30, metavar="DAYS",
+                        help="drop cached sections unused for this many days (default: 30)")
+    parser.add_argument("--cache-max-mb", type=float, default=512, metavar="MB",
+                        help="cap the cache size, evicting least recently used sections (default: 512)")
+    parser.add_argument("--watch", action="store_true",
+                        help="service mode: watch the given folder and process every report dropped "
+                             "into it until stopped (Ctrl+C / SIGTERM)")
+    parser.add_argument("--poll-interval", type=float, default=5.0, metavar="SECONDS",
+                        help="with --watch, how often to scan the folder (default: 5)")
+    parser.add_argument("--settle", type=float, default=10.0, metavar="SECONDS",
+                        help="with --watch, how long a file must stay unchanged before it is "
+                             "processed (default: 10)")
+    parser.add_argument("--state", metavar="FILE",
+                        help="with --watch, processed-files log (default: processed_files.jsonl "
+                             "in the output directory)")
+    parser.add_argument("--diff", action="store_true",
+                        help="compare two reports (OLD NEW) enrollment by enrollment and write "
+                             "diff_*.csv with added, dropped and changed rows and their FTES_$ impact")
+    parser.add_argument("--summary", action="store_true",
+                        help="also write summary_*.csv roll-ups by Term, Cmp, Subject, CRN, Acct_Method "
+                             "and SCFF_FTES with unduplicated headcount")
+    parser.add_argument("--columnar", action="store_true",
+                        help="also write columns_*.svrc: a binary columnar copy of the rows that "
+                             "ColumnarReport memory-maps without parsing")
+    parser.add_argument("--sqlite", metavar="DB",
+                        help="also load sections and student rows into this SQLite database "
+                             "(reloading a report replaces its sections)")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="append per-file stage times and counters to this file as JSON lines")
+    parser.add_argument("--log-metrics", action="store_true",
+                        help="print per-file stage times and counters as one line to stderr")
+    parser.add_argument("--profile", action="append", choices=PROFILERS, default=[],
+                        help="also run cProfile and/or tracemalloc and write their reports next to "
+                             "the CSV (repeatable; chunk worker processes are not profiled)")
+    parser.add_argument("--scenarios", metavar="JSON",
+                        help="named funding-rate sets ({name: rates}); writes FTES_$ totals by "
+                             "SCFF category for each, from the same parse")
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        if tk is None:
+            print("tkinter is not available; pass input files to run headless (see --help).",
+                  file=sys.stderr)
+            return 2
+        App().mainloop()
+        return 0
+
+    args = build_arg_parser().parse_args(argv)
+    if args.mode == "both" and (args.scenarios or args.cache_dir or args.diff):
+        print("--scenarios, --cache-dir and --diff need a single accounting mode.", file=sys.stderr)
+        return 2
+    try:
+        if args.mode == "both":
+            rates = {mode: load_rates(args.rates, mode) if args.rates else dict(DEFAULT_RATES[mode])
+                     for mode in PARSERS}
+        else:
+            rates = load_rates(args.rates, args.mode) if args.rates else dict(DEFAULT_RATES[args.mode])
+    except (OSError, ValueError) as e:
+        print(f"Could not load rates: {e}", file=sys.stderr)
+        return 2
+    try:
+        scenarios = load_scenarios(args.scenarios, args.mode) if args.scenarios else None
+    except (OSError, ValueError) as e:
+        print(f"Could not load scenarios: {e}", file=sys.stderr)
+        return 2
+
+    cache = None
+    if args.cache_dir:
+        cache = (args.cache_dir, args.cache_max_age, int(args.cache_max_mb * 1024 * 1024))
+
+    options = dict(diagnostics_level=args.diagnostics, scenarios=scenarios, cache=cache, compare=args.compare,
+                   chunk_workers=args.chunk_workers, sqlite=args.sqlite, summary=args.summary,
+                   columnar=args.columnar,
+                   encoding=args.encoding, metrics_file=args.metrics, log_metrics=args.log_metrics,
+                   profile=args.profile)
+    if args.watch:
+        return _main_watch(args, rates, options)
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("No input files matched.", file=sys.stderr)
+        return 2
+    if args.diff:
+        return _main_diff(paths, args.mode, rates, args.output_dir, args.encoding)
+
+    failures = 0
+    for file_path, result, error in process_batch(paths, args.mode, rates, args.output_dir, args.workers,
+                                                      **options):
+        if error:
+            failures += 1
+            print(f"FAILED  {file_path}: {error}", file=sys.stderr)
+        else:
+            print(f"OK      {file_path}: {result.rows} rows -> {result.output_file_path}")
+    print(f"{len(paths) - failures} of {len(paths)} file(s) processed.")
+    return 1 if failures else 0
+
+
+def _main_watch(args, rates, options):
+    if len(args.inputs) != 1 or not os.path.isdir(args.inputs[0]):
+        print("--watch takes exactly one folder.", file=sys.stderr)
+        return 2
+    stop = threading.Event()
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    def report(message):
+        print(f"{datetime.now():%Y-%m-%d %H:%M:%S}  {message}", flush=True)
+
+    try:
+        watch_folder(args.inputs[0], args.mode, rates, args.output_dir, args.workers or os.cpu_count() or 1,
+                     poll_interval=args.poll_interval, settle=args.settle, state_path=args.state,
+                     stop=stop, report=report, **options)
+    except KeyboardInterrupt:
+        pass
+    report("Stopped.")
+    return 0
+
+
+def _main_diff(paths, mode, rates, output_dir, encoding=None):
+    if len(paths) != 2:
+        print("--diff takes exactly two reports: OLD NEW.", file=sys.stderr)
+        return 2
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        result = diff_runs(*paths, mode, rates, output_dir, encoding=encoding)
+    except (ReportReadError, OSError) as e:
+        print(f"FAILED  {e}", file=sys.stderr)
+        return 1
+    print(f"{result.added} added, {result.dropped} dropped, {result.changed} changed, "
+          f"{result.unchanged} unchanged; FTES_$ {result.ftes_dollars_delta:+,.2f} -> {result.output_file_path}")
+    return 0
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  GUI
+# ═══════════════════════════════════════════════════════════════════════════
+
+class App(tk.Tk if tk is not None else object):
     def __init__(self):
         super().__init__()
         self.title("Student Data Processor")
-        self.geometry("520x380")
+        self.geometry("520x615")
         self.resizable(False, False)
 
         # ── Mode selector ───────────────────────────────────────────────
@@ -462,14 +3702,59 @@ class App(tk.Tk):
         # Initialize with default Non-Standardized rates
         self._load_defaults()
 
+        # ── Options ─────────────────────────────────────────────────────
+        options_frame = ttk.LabelFrame(self, text="Options", padding=10)
+        options_frame.pack(fill="x", padx=15, pady=(0, 5))
+
+        ttk.Label(options_frame, text="Diagnostics:").grid(row=0, column=0, sticky="w", padx=(0, 10))
+        self.diagnostics_var = tk.StringVar(value="summary")
+        ttk.Combobox(options_frame, textvariable=self.diagnostics_var, values=DIAGNOSTIC_LEVELS,
+                     state="readonly", width=12).grid(row=0, column=1, sticky="w")
+        self.cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Reuse unchanged sections from earlier runs",
+                        variable=self.cache_var).grid(row=1, column=0, columnspan=2, sticky="w", pady=(5, 0))
+        self.summary_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Write summary reports (totals and headcount)",
+                        variable=self.summary_var).grid(row=2, column=0, columnspan=2, sticky="w", pady=(5, 0))
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Profile the run (stage times, cProfile and memory; slower)",
+                        variable=self.profile_var).grid(row=3, column=0, columnspan=2, sticky="w", pady=(5, 0))
+
         # ── Buttons ─────────────────────────────────────────────────────
         btn_frame = ttk.Frame(self, padding=10)
         btn_frame.pack(fill="x", padx=15)
 
         ttk.Button(btn_frame, text="Reset to Defaults",
                    command=self._load_defaults).pack(side="left", padx=(0, 10))
-        ttk.Button(btn_frame, text="Open Detailed SVRCALD File & Process",
-                   command=self._open_and_process).pack(side="right")
+        self.open_button = ttk.Button(btn_frame, text="Open Detailed SVRCALD File & Process",
+                                      command=self._open_and_process)
+        self.open_button.pack(side="right")
+        self.scenario_button = ttk.Button(btn_frame, text="Add Rate Scenario",
+                                          command=self._add_scenario, state="disabled")
+        self.scenario_button.pack(side="left")
+
+        # ── Progress ────────────────────────────────────────────────────
+        progress_frame = ttk.LabelFrame(self, text="Progress", padding=10)
+        progress_frame.pack(fill="x", padx=15, pady=(5, 15))
+
+        self.progress_bar = ttk.Progressbar(progress_frame, maximum=100)
+        self.progress_bar.grid(row=0, column=0, sticky="ew", padx=(0, 10))
+        self.cancel_button = ttk.Button(progress_frame, text="Cancel", command=self._cancel, state="disabled")
+        self.cancel_button.grid(row=0, column=1)
+        self.progress_var = tk.StringVar(value="Idle")
+        ttk.Label(progress_frame, textvariable=self.progress_var).grid(row=1, column=0, columnspan=2,
+                                                                       sticky="w", pady=(5, 0))
+        progress_frame.columnconfigure(0, weight=1)
+
+        # Last processed report, kept so rate scenarios need no reparse
+        self.last_result = None
+        self.scenarios = {}
+
+        # Processing runs on a worker thread; it reports back through this queue
+        self._events = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._worker = None
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
     # ── Internal helpers ────────────────────────────────────────────────
 
@@ -504,6 +3789,7 @@ class App(tk.Tk):
             title="Select Detailed SVRCALD File (.lis or .txt)",
             filetypes=(
                 ("SVRCALD files", "*.lis *.txt"),
+                ("Compressed SVRCALD files", "*.gz *.bz2 *.zip"),
                 ("LIS files", "*.lis"),
                 ("Text files", "*.txt"),
                 ("All files", "*.*"),
@@ -512,12 +3798,139 @@ class App(tk.Tk):
         if not file_path:
             return
 
-        mode = self.mode_var.get()
-        if mode == "std":
-            process_file_std(file_path, rates)
+        # Tk variables may only be read on this thread, so collect everything first
+        options = dict(diagnostics_level=self.diagnostics_var.get(), keep_run=True,
+                       sinks=[SummarySink()] if self.summary_var.get() else [],
+                       profile=PROFILERS if self.profile_var.get() else ())
+        use_cache = self.cache_var.get()
+        self._cancel_event.clear()
+        self._worker = threading.Thread(target=self._process_in_background,
+                                        args=(file_path, self.mode_var.get(), rates, use_cache, options),
+                                        daemon=True)
+        self.open_button.configure(state="disabled")
+        self.scenario_button.configure(state="disabled")
+        self.cancel_button.configure(state="normal")
+        self.progress_bar.configure(value=0)
+        self.progress_var.set(f"Reading {os.path.basename(file_path)}...")
+        self._worker.start()
+        self.after(100, self._poll_events)
+
+    def _process_in_background(self, file_path, mode, rates, use_cache, options):
+        """Worker thread: run process_file() and post the outcome to the event queue."""
+        def progress(status):
+            if self._cancel_event.is_set():
+                raise ProcessingCancelled()
+            self._events.put(("progress", (status.bytes_done, status.total_bytes, status.lines,
+                                           status.rows, status.rows_per_s, status.eta)))
+
+        # SQLite connections belong to the thread that opened them
+        cache = BlockCache(DEFAULT_CACHE_DIR) if use_cache else None
+        try:
+            result = process_file(file_path, mode, rates, cache=cache, progress=progress, **options)
+        except ProcessingCancelled:
+            self._events.put(("cancelled", None))
+        except ReportReadError as e:
+            if isinstance(e.__cause__, PermissionError):
+                self._events.put(("error", ("Permission Error", f"Permission denied: {e}")))
+            else:
+                self._events.put(("error", ("Error", f"Could not read file: {e}")))
+        except ReportParseError as e:
+            self._events.put(("error", ("Error", f"Could not parse file: {e}")))
+        except OSError as e:
+            self._events.put(("error", ("Error", f"Could not write to file: {e}")))
+        except Exception as e:
+            self._events.put(("error", ("Error", f"Processing failed: {type(e).__name__}: {e}")))
         else:
-            process_file_nonstd(file_path, rates)
+            self._events.put(("done", (result, rates)))
+        finally:
+            if cache is not None:
+                cache.close()
+
+    def _poll_events(self):
+        """Apply the worker's queued events on the Tk thread; reschedules itself until the run ends."""
+        try:
+            while True:
+                kind, payload = self._events.get_nowait()
+                if kind == "progress":
+                    self._show_progress(*payload)
+                else:
+                    self._finish(kind, payload)
+                    return
+        except queue.Empty:
+            pass
+        self.after(100, self._poll_events)
+
+    def _show_progress(self, bytes_done, total_bytes, lines, rows, rows_per_s, eta):
+        self.progress_bar.configure(value=100 * bytes_done / total_bytes if total_bytes else 100)
+        text = (f"{bytes_done / 1048576:,.1f} of {total_bytes / 1048576:,.1f} MB  ·  {lines:,} lines  ·  "
+                f"{rows:,} rows  ·  {rows_per_s:,.0f} rows/s")
+        if eta is not None:
+            minutes, seconds = divmod(int(eta), 60)
+            text += f"  ·  ETA {minutes}:{seconds:02d}"
+        self.progress_var.set(text)
+
+    def _finish(self, kind, payload):
+        self._worker = None
+        self.open_button.configure(state="normal")
+        self.cancel_button.configure(state="disabled")
+        if kind == "cancelled":
+            self.progress_bar.configure(value=0)
+            self.progress_var.set("Cancelled; partial output removed.")
+            if self.last_result is not None:
+                self.scenario_button.configure(state="normal")
+            return
+        if kind == "error":
+            self.progress_var.set("Failed.")
+            if self.last_result is not None:
+                self.scenario_button.configure(state="normal")
+            messagebox.showerror(*payload)
+            return
+
+        result, rates = payload
+        self.progress_bar.configure(value=100)
+        self.progress_var.set(f"Done: {result.rows:,} rows.")
+        self.last_result = result
+        self.scenarios = {"Processed rates": rates}
+        self.scenario_button.configure(state="normal")
+        message = f"Output saved to {result.output_file_path}"
+        if result.diagnostic_file_path:
+            message += f"\nDiagnostics saved to {result.diagnostic_file_path}"
+        if "summary_term" in result.outputs:
+            message += f"\nSummary reports saved to {os.path.dirname(result.outputs['summary_term']) or '.'}"
+        if result.metrics is not None:
+            stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result.metrics.stages.items())
+            message += (f"\n\nTime: {result.metrics.seconds:.2f}s ({stages})"
+                        f"\nProfile saved to {result.outputs['profile_stats']}")
+        messagebox.showinfo("Success", message)
+
+    def _cancel(self):
+        self._cancel_event.set()
+        self.cancel_button.configure(state="disabled")
+        self.progress_var.set("Cancelling...")
+
+    def _on_close(self):
+        """Stop a running job so its partial output is removed before the window goes."""
+        if self._worker is not None:
+            self._cancel_event.set()
+            self._worker.join(timeout=10)
+        self.destroy()
+
+    def _add_scenario(self):
+        """Recompute FTES_$ for the last processed report under the current rate entries."""
+        rates = self._read_rates()
+        if rates is None or self.last_result is None:
+            return
+        self.scenarios[f"Scenario {len(self.scenarios)}"] = rates
+        path = companion_path(self.last_result.output_file_path, "scenario_totals")
+        try:
+            write_scenario_totals(path, self.last_result.run, self.scenarios)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not write to file: {e}")
+            return
+        lines = [f"{name}: ${sum(self.last_result.run.funding(r)):,.2f}" for name, r in self.scenarios.items()]
+        messagebox.showinfo("Rate Scenarios",
+                            "Total FTES_$ by scenario:\n" + "\n".join(lines) + f"\n\nSaved to {path}")
 
 
 if __name__ == "__main__":
-    App().mainloop()
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+ColumnarSink -> ColumnarReport round trip with a row group of a few rows,
+so the columns are spilled and read back over many row groups: every column
+must match the CSV of the same run, in each mode and for both files of a
+dual-mode run, and parsed_run() must reproduce FTES_$.
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402
+import student_data_processor as sdp  # noqa: E402
+
+ROW_GROUP = 7
+
+
+def printed_tolerance(text):
+    """Half a unit in the last printed digit of a CSV number."""
+    _, point, decimals = text.partition(".")
+    return 0.5 * 10 ** -len(decimals) if point else 0.5
+
+
+class ColumnarTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.tmp = cls._tmp.name
+        cls.report = os.path.join(cls.tmp, "synthetic.lis")
+        benchmark.write_synthetic_report(cls.report, sections=120, junk=0.03, bad_ids=0.02, seed=13)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def process(self, mode):
+        output_dir = os.path.join(self.tmp, mode)
+        os.makedirs(output_dir)
+        rates = sdp.DEFAULT_RATES if mode == "both" else sdp.DEFAULT_RATES[mode]
+        with mock.patch.object(sdp, "COLUMNAR_ROW_GROUP", ROW_GROUP):
+            return sdp.process_file(self.report, mode, rates, output_dir, name="synthetic",
+                                    diagnostics_level="off", sinks=[sdp.ColumnarSink()])
+
+    def assertMatchesCsv(self, columnar_path, csv_path, mode):
+        with open(csv_path, newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            csv_columns = dict(zip(header, zip(*reader)))
+        with sdp.ColumnarReport(columnar_path) as report:
+            self.assertEqual(report.mode, mode)
+            self.assertEqual(report.names, header)
+            self.assertEqual(len(report), len(csv_columns["Term"]))
+            self.assertGreater(len(report), 3 * ROW_GROUP)
+            for name in header:
+                with self.subTest(mode=mode, column=name):
+                    expected = csv_columns[name]
+                    column = report.column(name)
+                    self.assertEqual(len(column), len(expected))
+                    if isinstance(column, list):
+                        mismatch = next((r for r, pair in enumerate(zip(column, expected)) if pair[0] != pair[1]),
+                                        None)
+                    else:
+                        mismatch = next((r for r, (value, text) in enumerate(zip(column, expected))
+                                         if abs(value - float(text)) > printed_tolerance(text) + 1e-9), None)
+                        column.release()
+                    self.assertIsNone(mismatch, "first differing row")
+
+            run = report.parsed_run()
+            funding = run.funding(sdp.DEFAULT_RATES[mode])
+            ftes_dollars = report.numbers("FTES_$")
+            self.assertTrue(funding.tobytes() == ftes_dollars.tobytes(), "funding() differs from FTES_$")
+            ftes_dollars.release()
+            self.assertIsNone(next((r for r, (value, text) in enumerate(zip(funding, csv_columns["FTES_$"]))
+                                    if f"{value:.2f}" != text), None), "first row whose FTES_$ differs")
+
+    def test_single_mode(self):
+        for mode in sdp.PARSERS:
+            result = self.process(mode)
+            self.assertMatchesCsv(result.outputs["columns"], result.output_file_path, mode)
+
+    def test_dual_mode(self):
+        result = self.process("both")
+        self.assertMatchesCsv(result.outputs["columns_nonstd"], result.output_file_path, "nonstd")
+        self.assertMatchesCsv(result.outputs["columns_std"], result.outputs["std"], "std")
+
+
+if __name__ == "__main__":
+    unittest.main()
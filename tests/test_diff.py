@@ -0,0 +1,110 @@
+"""
+diff_runs on a synthetic report and an edited copy of it (student lines
+dropped, added and given more hours): the added/dropped/changed counts and
+the FTES_$ delta must come out right whichever of the two reports is the
+smaller one, which is the one diff_runs indexes.
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402
+import student_data_processor as sdp  # noqa: E402
+
+MODE = "std"
+RATES = sdp.DEFAULT_RATES[MODE]
+DROPPED, ADDED, CHANGED = 10, 30, 15
+ID_START = benchmark.STUDENT_COLUMNS["student_id"]
+HOURS_START, HOURS_END = benchmark.STUDENT_NUMBER_ENDS["res_enrl"], benchmark.STUDENT_NUMBER_ENDS["res_hrs"]
+
+
+def ftes_dollars(path):
+    """The report's FTES_$ total as printed, row by row."""
+    return sum(float(format(row.ftes_dollars, ".2f")) for row in sdp.iter_rows(path, MODE, RATES))
+
+
+class DiffRunsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.tmp = cls._tmp.name
+        cls.base = os.path.join(cls.tmp, "base.lis")
+        benchmark.write_synthetic_report(cls.base, sections=300, junk=0.03, bad_ids=0.02, seed=5)
+        cls.edited = os.path.join(cls.tmp, "edited.lis")
+        cls.base_rows = cls.write_edited(cls.base, cls.edited)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    @staticmethod
+    def write_edited(base, edited):
+        """
+        Copy ``base`` with the DROPPED cheapest paid enrollments removed, a new
+        student added after each of the ADDED dearest ones and CHANGED others
+        given more resident hours. Students listed once in the whole report
+        are picked, so every edit is exactly one enrollment.
+        """
+        rows = list(sdp.iter_rows(base, MODE, RATES))
+        counts = Counter(row.student_id for row in rows)
+        paid = sorted((row for row in rows if counts[row.student_id] == 1 and row.ftes_dollars > 0),
+                      key=lambda row: row.ftes_dollars)
+        dropped = {row.student_id for row in paid[:DROPPED]}
+        added = {row.student_id for row in paid[-ADDED:]}
+        changed = {row.student_id for row in paid[DROPPED:DROPPED + CHANGED]}
+
+        with open(base, newline="") as f:
+            lines = f.read().split("\r\n")
+        out = []
+        for line in lines:
+            student_id = line[ID_START:ID_START + 9]
+            if student_id in dropped:
+                continue
+            if student_id in changed:
+                hours = float(line[HOURS_START:HOURS_END].replace(",", ""))
+                line = f"{line[:HOURS_START]}{2 * hours + 1:>{HOURS_END - HOURS_START},.2f}{line[HOURS_END:]}"
+            out.append(line)
+            if student_id in added:
+                # Below the generator's ID range, so never already in the report
+                out.append(f"{line[:ID_START]}S{len(out):08d}{line[ID_START + 9:]}")
+        with open(edited, "w", newline="") as f:
+            f.write("\r\n".join(out))
+        return len(rows)
+
+    def diff(self, old, new):
+        output_dir = os.path.join(self.tmp, f"{os.path.basename(old)}_to_{os.path.basename(new)}")
+        os.makedirs(output_dir)
+        return sdp.diff_runs(old, new, MODE, RATES, output_dir, name="test")
+
+    def assertDiff(self, result, added, dropped, expected_delta):
+        self.assertEqual((result.added, result.dropped, result.changed), (added, dropped, CHANGED))
+        self.assertEqual(result.unchanged, self.base_rows - DROPPED - CHANGED)
+        self.assertAlmostEqual(result.ftes_dollars_delta, expected_delta, delta=0.005)
+        with open(result.output_file_path, newline="") as f:
+            changes = Counter(row["Change"] for row in csv.DictReader(f))
+        self.assertEqual(changes, {"added": added, "dropped": dropped, "changed": CHANGED})
+
+    def test_new_report_larger(self):
+        self.assertLess(os.path.getsize(self.base), os.path.getsize(self.edited))
+        delta = ftes_dollars(self.edited) - ftes_dollars(self.base)
+        self.assertGreater(delta, 0)
+        result = self.diff(self.base, self.edited)
+        self.assertDiff(result, ADDED, DROPPED, delta)
+        self.assertGreater(result.ftes_dollars_delta, 0)
+
+    def test_new_report_smaller(self):
+        delta = ftes_dollars(self.base) - ftes_dollars(self.edited)
+        result = self.diff(self.edited, self.base)
+        self.assertDiff(result, DROPPED, ADDED, delta)
+        self.assertLess(result.ftes_dollars_delta, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+The batch FTES engine must match the scalar functions exactly: the pure-Python
+path always, and the NumPy path whenever NumPy is installed.
+"""
+
+import os
+import sys
+import unittest
+from itertools import product
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import student_data_processor as sdp  # noqa: E402
+
+METHODS = {
+    "nonstd": ("W", "D", "P", "IW", "ID", "IN", "S", "XX"),
+    "std":    ("S", "P", "IN", "UNKNOWN"),
+}
+# (credit_ind, special_admit, cdcp_ind) giving each SCFF category
+FLAGS = (("Y", "N", "Y"), ("Y", "Y", "N"), ("N", "N", "N"), ("Y", "N", "N"), ("Y", "", "N"))
+HOURS = ((54.0, 0.0), (17.5 / 3, 12.25), (0.0, 1260.0), (1.5, 0.0), (1000.0 / 7, 8.0))
+
+
+def scalar(mode, acct_method, res_hrs, non_res_hrs, cr_ind):
+    if mode == "std":
+        return sdp.calculate_ftes_std(acct_method, res_hrs, non_res_hrs, 1.0, cr_ind)
+    return sdp.calculate_ftes_nonstd(acct_method, res_hrs, non_res_hrs, cr_ind)
+
+
+class FtesEngineTest(unittest.TestCase):
+
+    def batch(self, mode):
+        """Every method x SCFF category x hours combination: StudentColumns and the inputs per row."""
+        columns, rows = sdp.StudentColumns(), []
+        for acct_method, flags, (res_hrs, non_res_hrs) in product(METHODS[mode], FLAGS, HOURS):
+            category = sdp.scff_category(*flags)
+            columns.append(acct_method, flags[0], res_hrs, non_res_hrs, category)
+            rows.append((acct_method, flags, res_hrs, non_res_hrs))
+        self.assertGreaterEqual(len(columns), sdp.NUMPY_MIN_BATCH)
+        self.assertEqual({c for c in columns.category}, set(range(len(sdp.SCFF_LABELS))))
+        return columns, rows
+
+    def test_python_matches_scalar(self):
+        for mode in METHODS:
+            rates = sdp.DEFAULT_RATES[mode]
+            columns, rows = self.batch(mode)
+            out = sdp._compute_ftes_python(mode, columns, rates)
+            for i, (acct_method, flags, res_hrs, non_res_hrs) in enumerate(rows):
+                resident_ftes, non_resident_ftes, res_out, non_res_out, eligible = scalar(
+                    mode, acct_method, res_hrs, non_res_hrs, flags[0])
+                dollars, label = sdp.calculate_funding_and_label(resident_ftes, *flags, rates)
+                with self.subTest(mode=mode, row=rows[i]):
+                    self.assertEqual(
+                        (out.resident_ftes[i], out.non_resident_ftes[i], out.res_hrs[i], out.non_res_hrs[i],
+                         out.eligible_hrs[i], out.total_ftes[i], out.ftes_dollars[i], out.labels[i]),
+                        (resident_ftes, non_resident_ftes, res_out, non_res_out, eligible,
+                         resident_ftes + non_resident_ftes, dollars, label))
+
+    @unittest.skipUnless(sdp.np, "NumPy is not installed")
+    def test_numpy_matches_python(self):
+        for mode in METHODS:
+            rates = sdp.DEFAULT_RATES[mode]
+            columns, _ = self.batch(mode)
+            with self.subTest(mode=mode):
+                self.assertEqual(sdp._compute_ftes_numpy(mode, columns, rates),
+                                 sdp._compute_ftes_python(mode, columns, rates))
+
+    @unittest.skipUnless(sdp.np, "NumPy is not installed")
+    def test_numpy_funding_matches_python(self):
+        for mode in METHODS:
+            rates = sdp.DEFAULT_RATES[mode]
+            columns, _ = self.batch(mode)
+            run = sdp.ParsedRun(mode)
+            run.extend(columns, sdp._compute_ftes_python(mode, columns, rates))
+            with self.subTest(mode=mode):
+                with_numpy = run.funding(rates)
+                with mock.patch.object(sdp, "np", None):
+                    self.assertEqual(with_numpy, run.funding(rates))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Every parse path (serial, chunked parallel, section cache cold and warm, and
+the single-pass dual mode) must write byte-for-byte the same CSV as the serial
+parser, on a synthetic report from benchmark.py.
+"""
+
+import filecmp
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402
+import student_data_processor as sdp  # noqa: E402
+
+CHUNK_WORKERS = 3
+
+
+class OutputIdentityTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.tmp = cls._tmp.name
+        cls.report = os.path.join(cls.tmp, "synthetic.lis")
+        benchmark.write_synthetic_report(cls.report, sections=600, junk=0.05, bad_ids=0.02, seed=7)
+        cls.serial = {mode: cls.process(f"serial_{mode}", mode).output_file_path for mode in sdp.PARSERS}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    @classmethod
+    def process(cls, tag, mode, **options):
+        output_dir = os.path.join(cls.tmp, tag)
+        os.makedirs(output_dir)
+        rates = sdp.DEFAULT_RATES if mode == "both" else sdp.DEFAULT_RATES[mode]
+        return sdp.process_file(cls.report, mode, rates, output_dir, name="synthetic",
+                                diagnostics_level="off", **options)
+
+    def assertSameFile(self, path, mode):
+        self.assertTrue(filecmp.cmp(path, self.serial[mode], shallow=False),
+                        f"{path} differs from the serial {mode} output")
+
+    def test_parallel(self):
+        size = os.path.getsize(self.report)
+        chunks = len(sdp.find_chunk_offsets(self.report, sdp.chunk_size(size, CHUNK_WORKERS))) - 1
+        self.assertGreater(chunks, CHUNK_WORKERS)
+        for mode in sdp.PARSERS:
+            with self.subTest(mode=mode), mock.patch.object(sdp, "PARALLEL_MIN_BYTES", 0):
+                result = self.process(f"parallel_{mode}", mode, chunk_workers=CHUNK_WORKERS)
+                self.assertSameFile(result.output_file_path, mode)
+
+    def test_cache(self):
+        for mode in sdp.PARSERS:
+            cache = sdp.BlockCache(os.path.join(self.tmp, f"cache_{mode}"))
+            try:
+                for run in ("cold", "warm"):
+                    with self.subTest(mode=mode, run=run):
+                        result = self.process(f"cache_{mode}_{run}", mode, cache=cache)
+                        self.assertSameFile(result.output_file_path, mode)
+            finally:
+                cache.close()
+
+    def test_dual(self):
+        result = self.process("dual", "both")
+        self.assertSameFile(result.output_file_path, "nonstd")
+        self.assertSameFile(result.outputs["std"], "std")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+A student line that cannot be parsed fails the run with a ReportParseError
+naming the line an editor shows, on every parse path, and leaves no partial
+output behind.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402
+import student_data_processor as sdp  # noqa: E402
+
+
+class ParseErrorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.tmp = cls._tmp.name
+        cls.report = os.path.join(cls.tmp, "paginated.lis")
+        # Synthetic page headers start with a form feed, which str.splitlines() counts as a line break
+        benchmark.write_synthetic_report(cls.report, sections=300, seed=3)
+        with open(cls.report, "rb") as f:
+            lines = f.read().split(b"\n")
+        cls.line_number = next(i for i, line in enumerate(lines, 1)
+                               if i > len(lines) // 2 and line[8:9] == b"S" and line[110:122].strip())
+        line = lines[cls.line_number - 1]
+        lines[cls.line_number - 1] = line[:110] + b"12x.50".rjust(12) + line[122:]
+        with open(cls.report, "wb") as f:
+            f.write(b"\n".join(lines))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def assertFails(self, tag, mode, **options):
+        output_dir = os.path.join(self.tmp, tag)
+        os.makedirs(output_dir)
+        rates = sdp.DEFAULT_RATES if mode == "both" else sdp.DEFAULT_RATES[mode]
+        with self.assertRaises(sdp.ReportParseError) as caught:
+            sdp.process_file(self.report, mode, rates, output_dir, **options)
+        self.assertEqual(caught.exception.line_number, self.line_number)
+        self.assertIn("12x.50", str(caught.exception))
+        self.assertEqual(os.listdir(output_dir), [])
+
+    def test_serial(self):
+        self.assertFails("serial", "std")
+
+    def test_dual(self):
+        self.assertFails("dual", "both", compare=True)
+
+    def test_cache(self):
+        cache = sdp.BlockCache(os.path.join(self.tmp, "block_cache"))
+        try:
+            self.assertFails("cache", "std", cache=cache)
+        finally:
+            cache.close()
+
+    def test_parallel(self):
+        with mock.patch.object(sdp, "PARALLEL_MIN_BYTES", 0):
+            self.assertFails("parallel", "std", chunk_workers=3)
+
+    def test_iter_rows(self):
+        with self.assertRaises(sdp.ReportParseError) as caught:
+            list(sdp.iter_rows(self.report, "std", sdp.DEFAULT_RATES["std"]))
+        self.assertEqual(caught.exception.line_number, self.line_number)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+SqliteSink loads: a load in progress must not lock the database for other
+loads, the loaded enrollments must be exactly the last load of each
+Term/CRN, and an aborted load must leave the database as it was.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402
+import student_data_processor as sdp  # noqa: E402
+
+MODE = "std"
+
+
+class SqliteSinkTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.tmp = cls._tmp.name
+        cls.reports = []
+        for seed in (1, 2):
+            report = os.path.join(cls.tmp, f"report_{seed}.lis")
+            benchmark.write_synthetic_report(report, sections=300, junk=0.02, bad_ids=0.01, seed=seed)
+            cls.reports.append(report)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def setUp(self):
+        self.db_path = os.path.join(self.tmp, f"{self.id().rsplit('.', 1)[-1]}.db")
+
+    def rows(self, report):
+        return list(sdp.iter_rows(report, MODE, sdp.DEFAULT_RATES[MODE]))
+
+    def sink(self):
+        sink = sdp.SqliteSink(self.db_path, batch_rows=50, timeout=1)
+        self.addCleanup(sink.close)
+        return sink
+
+    def load(self, sink, report, rows):
+        for row in rows:
+            sink.add(row)
+        sink.finish(SimpleNamespace(file_path=report))
+
+    def enrollments(self):
+        """(term, crn, mode) -> [(student_id, total_ftes), ...] in seq order."""
+        found = {}
+        with sqlite3.connect(self.db_path) as db:
+            for term, crn, mode, student_id, total_ftes in db.execute(
+                    "SELECT term, crn, mode, student_id, total_ftes FROM enrollments ORDER BY term, crn, mode, seq"):
+                found.setdefault((term, crn, mode), []).append((student_id, total_ftes))
+        return found
+
+    def expected(self, *loads):
+        """What loading the given row lists in order must leave in ``enrollments``."""
+        expected = {}
+        for rows in loads:
+            loaded = {}
+            for row in rows:
+                key = (row.section.term or "", row.section.crn or "", row.section.mode)
+                loaded.setdefault(key, []).append((row.student_id, row.total_ftes))
+            expected.update(loaded)
+        return expected
+
+    def loads(self):
+        with sqlite3.connect(self.db_path) as db:
+            return db.execute("SELECT source, rows, status FROM loads ORDER BY load_id").fetchall()
+
+    def test_interleaved_loads(self):
+        first, second = (self.rows(report) for report in self.reports)
+        loading = self.sink()
+        half = len(first) // 2
+        for row in first[:half]:
+            loading.add(row)
+        # The first load is half staged: a whole second load must get through.
+        self.load(self.sink(), self.reports[1], second)
+        self.assertEqual(self.enrollments(), self.expected(second))
+        for row in first[half:]:
+            loading.add(row)
+        loading.finish(SimpleNamespace(file_path=self.reports[0]))
+        self.assertEqual(self.enrollments(), self.expected(second, first))
+        self.assertEqual(self.loads(), [(os.path.abspath(self.reports[1]), len(second), "complete"),
+                                        (os.path.abspath(self.reports[0]), len(first), "complete")])
+
+    def test_concurrent_batch(self):
+        output_dir = os.path.join(self.tmp, "batch")
+        os.makedirs(output_dir)
+        for path, result, error in sdp.process_batch(self.reports, MODE, sdp.DEFAULT_RATES[MODE], output_dir,
+                                                     workers=2, sqlite=self.db_path, diagnostics_level="off"):
+            self.assertIsNone(error, path)
+        self.assertEqual(sorted(status for _, _, status in self.loads()), ["complete", "complete"])
+        # The loads may commit in either order; only Term/CRNs in both reports depend on it.
+        first, second = (self.rows(report) for report in self.reports)
+        either = (self.expected(first, second), self.expected(second, first))
+        found = self.enrollments()
+        for key in found.keys() | either[0].keys():
+            self.assertIn(found.get(key), (either[0].get(key), either[1].get(key)), key)
+
+    def test_abort(self):
+        rows = self.rows(self.reports[0])
+        self.load(self.sink(), self.reports[0], rows)
+        sink = self.sink()
+        for row in self.rows(self.reports[1]):
+            sink.add(row)
+        sink.abort()
+        self.assertEqual(self.enrollments(), self.expected(rows))
+        self.assertEqual([status for _, _, status in self.loads()], ["complete", "aborted"])
+        # The sink is reusable after an abort.
+        self.load(sink, self.reports[0], rows)
+        self.assertEqual(self.enrollments(), self.expected(rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+StudentIndex queries against brute force over the parsed rows: batch
+totals and enrollments (overall and per term), students_over, a section
+replaced by a later load, and a save()/load() round trip.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402
+import student_data_processor as sdp  # noqa: E402
+
+MODE = "std"
+UNKNOWN = "S00000000"
+
+
+def expected_totals(rows, term=None):
+    totals = defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+    for row in rows:
+        if term is None or row.section.term == term:
+            t = totals[row.student_id]
+            t[0] += 1
+            t[1] += row.resident_ftes
+            t[2] += row.total_ftes
+            t[3] += row.ftes_dollars
+    return totals
+
+
+def as_dicts(rows):
+    return [row.as_dict() for row in rows]
+
+
+class StudentIndexTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.tmp = cls._tmp.name
+        cls.report = os.path.join(cls.tmp, "synthetic.lis")
+        benchmark.write_synthetic_report(cls.report, sections=300, junk=0.02, bad_ids=0.01,
+                                         students=(0, 20), seed=3)
+        cls.rows = list(sdp.iter_rows(cls.report, MODE, sdp.DEFAULT_RATES[MODE]))
+        # A handful of students, including some with rows in more than one term
+        by_student = defaultdict(set)
+        for row in cls.rows:
+            by_student[row.student_id].add(row.section.term)
+        several = [s for s, terms in by_student.items() if len(terms) > 1][:5]
+        cls.ids = several + sorted(by_student)[::97][:20] + [UNKNOWN]
+        cls.terms = sorted({row.section.term for row in cls.rows})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def index(self):
+        index = sdp.StudentIndex()
+        index.add_report(self.report, MODE)
+        return index
+
+    def assertQueriesMatch(self, index, rows):
+        self.assertEqual(len(index), len(rows))
+        for term in (None, *self.terms):
+            with self.subTest(term=term):
+                expected = expected_totals(rows, term)
+                totals = index.totals(self.ids, term)
+                self.assertEqual(totals.keys(), {s for s in self.ids if s in expected})
+                for student_id, got in totals.items():
+                    count, resident_ftes, total_ftes, ftes_dollars = expected[student_id]
+                    self.assertEqual(got.rows, count)
+                    self.assertAlmostEqual(got.resident_ftes, resident_ftes, places=9)
+                    self.assertAlmostEqual(got.total_ftes, total_ftes, places=9)
+                    self.assertAlmostEqual(got.ftes_dollars, ftes_dollars, places=6)
+
+                enrollments = index.enrollments(self.ids, term)
+                wanted = defaultdict(list)
+                for row in rows:
+                    if row.student_id in self.ids and (term is None or row.section.term == term):
+                        wanted[row.student_id].append(row.as_dict())
+                self.assertEqual({s: as_dicts(found) for s, found in enrollments.items()}, wanted)
+
+                threshold = 1.0
+                over = index.students_over(threshold, "total_ftes", term)
+                self.assertEqual(sorted(s for s, _ in over),
+                                 sorted(s for s, t in expected.items() if t[2] > threshold))
+                values = [value for _, value in over]
+                self.assertEqual(values, sorted(values, reverse=True))
+
+        live = {row.student_id for row in rows}
+        for student_id in self.ids:
+            self.assertEqual(student_id in index, student_id in live, student_id)
+
+    def test_queries(self):
+        self.assertQueriesMatch(self.index(), self.rows)
+
+    def test_section_replaced(self):
+        # A student whose only enrollment is in a section that has other students
+        sections = defaultdict(list)
+        counts = defaultdict(int)
+        for row in self.rows:
+            sections[(row.section.term, row.section.crn)].append(row)
+            counts[row.student_id] += 1
+        key, gone = next((key, row.student_id) for key, rows in sections.items() if len(rows) > 1
+                         for row in rows if counts[row.student_id] == 1)
+        reloaded = [row for row in sdp.iter_rows(self.report, MODE, sdp.DEFAULT_RATES[MODE])
+                    if (row.section.term, row.section.crn) == key and row.student_id != gone]
+
+        index = self.index()
+        self.assertIn(gone, index)
+        index.add_rows(reloaded, "corrected")
+        self.ids = [*self.ids, gone]
+        self.assertNotIn(gone, index)
+        self.assertEqual(index.enrollments([gone]), {})
+        self.assertEqual(index.totals([gone]), {})
+        remaining = [row for row in self.rows if (row.section.term, row.section.crn) != key]
+        self.assertQueriesMatch(index, remaining + reloaded)
+
+    def test_save_load(self):
+        index = self.index()
+        path = os.path.join(self.tmp, "index.pickle")
+        index.save(path)
+        loaded = sdp.StudentIndex.load(path)
+        self.assertEqual(loaded.sources, [self.report])
+        self.assertQueriesMatch(loaded, self.rows)
+        self.assertEqual(as_dicts(loaded.section_rows(self.rows[0].section.crn)),
+                         as_dicts(index.section_rows(self.rows[0].section.crn)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+SummarySink roll-ups must agree with a pivot over the CSV the same run wrote:
+Rows, Headcount (distinct Student IDs) and the hour/FTES sums per group of
+every dimension, in each mode and for both CSVs of a dual-mode run.
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402
+import student_data_processor as sdp  # noqa: E402
+
+SUMMED = sdp.SUMMARY_FIELDNAMES[2:]
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def pivot(rows, columns):
+    """Key -> [Rows, Headcount, *SUMMED sums] over the CSV rows, and the same for all rows."""
+    groups = defaultdict(lambda: [0, set(), *[0.0] * len(SUMMED)])
+    total = [0, set(), *[0.0] * len(SUMMED)]
+    for row in rows:
+        for group in (groups[tuple(row[c] for c in columns)], total):
+            group[0] += 1
+            group[1].add(row["Student ID"])
+            for i, field in enumerate(SUMMED, 2):
+                group[i] += float(row[field])
+    return groups, total
+
+
+class SummarySinkTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.tmp = cls._tmp.name
+        cls.report = os.path.join(cls.tmp, "synthetic.lis")
+        benchmark.write_synthetic_report(cls.report, sections=400, junk=0.05, bad_ids=0.02, seed=11)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def process(self, mode):
+        output_dir = os.path.join(self.tmp, mode)
+        os.makedirs(output_dir)
+        rates = sdp.DEFAULT_RATES if mode == "both" else sdp.DEFAULT_RATES[mode]
+        return sdp.process_file(self.report, mode, rates, output_dir, name="synthetic",
+                                diagnostics_level="off", sinks=[sdp.SummarySink()])
+
+    def assertSummaryMatches(self, csv_path, outputs, suffix):
+        rows = read_csv(csv_path)
+        self.assertTrue(rows)
+        for name, (columns, _) in sdp.SUMMARY_DIMENSIONS.items():
+            with self.subTest(dimension=name, csv=os.path.basename(csv_path)):
+                summary = read_csv(outputs[f"summary_{name}{suffix}"])
+                groups, total = pivot(rows, columns)
+                *body, total_row = summary
+                self.assertEqual(total_row[columns[0]], "Total")
+                found = {tuple(r[c] for c in columns): r for r in body}
+                self.assertEqual(found.keys(), groups.keys())
+                for key, expected in [*groups.items(), (None, total)]:
+                    got = total_row if key is None else found[key]
+                    self.assertEqual(int(got["Rows"]), expected[0], key)
+                    self.assertEqual(int(got["Headcount"]), len(expected[1]), key)
+                    # The summary sums unrounded values, the pivot the printed ones.
+                    for i, field in enumerate(SUMMED, 2):
+                        tolerance = 0.01 + expected[0] * (0.005 if field.endswith(("Hours", "$")) else 0.00005)
+                        self.assertAlmostEqual(float(got[field]), expected[i], delta=tolerance,
+                                               msg=f"{key} {field}")
+
+    def test_single_mode(self):
+        for mode in sdp.PARSERS:
+            result = self.process(mode)
+            self.assertSummaryMatches(result.output_file_path, result.outputs, "")
+
+    def test_dual_mode(self):
+        result = self.process("both")
+        self.assertSummaryMatches(result.output_file_path, result.outputs, "_nonstd")
+        self.assertSummaryMatches(result.outputs["std"], result.outputs, "_std")
+
+
+if __name__ == "__main__":
+    unittest.main()